@@ -0,0 +1,319 @@
+"""
+File:           ai.py
+Description:    Lookahead search for a bot player
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+The search plays blocks on a board of its own, kept as a tuple of column
+tuples, bottom jewel first. With the pieces stacked like this a fall is just
+a shorter column, and a move makes new tuples only for the columns it
+changes; every other column is shared with the board it came from. So the
+thousands of boards a search goes through cost no copying of the board.
+
+Each placement (a column and a rotation, or just a column for a wild block)
+is followed through its whole cascade, scored as the engine would score it.
+The boards that result are rated by evaluate(), a weighted sum of a few
+features; the weights can be tuned (see WEIGHTS).
+
+simulate.LookaheadPolicy plays the engine with it, and train.py tunes the
+weights.
+
+"""
+
+import json
+
+from matching import DIRECTIONS, points
+from common import NCOLS, NROWS, BLOCK_SIZE, MIN_RUN, JEWEL_SCORE
+
+# Steps along each of the DIRECTIONS, as (col, height)
+STEPS = tuple((dc, -dr) for dr, dc in DIRECTIONS)
+
+# Weights of the features of a board (see Search.evaluate())
+WEIGHTS = {
+    'points':       1.0,        # Points scored on the way to the board
+    'height':       -60.0,      # Height of the highest column
+    'jewels':       -10.0,      # Jewels on the board
+    'bumpiness':    -20.0,      # Sum of the steps between columns
+    'center':       -40.0,      # Height of the column blocks come in at
+    'pairs':        40.0,       # Top jewels next to one of their colour
+    'topout':       -1e6,       # No room for the next block
+}
+
+
+def load_weights(path):
+    """Weights from a JSON file
+
+    The file holds a dict of weights, or is a checkpoint of train.py, whose
+    best weights are taken.
+    """
+    with open(path) as f:
+        weights = json.load(f)
+    if 'best' in weights:
+        weights = weights['best']['weights']
+    return weights
+
+
+def from_board(board):
+    """Columns of an engine board (GridBoard or BitBoard)"""
+    cols = []
+    for c in range(board.ncols):
+        col = []
+        for r in range(board.nrows-1, -1, -1):
+            piece = board.get(r, c)
+            if not piece: break
+            col.append(piece)
+        cols.append(tuple(col))
+    return tuple(cols)
+
+
+def rotated(pieces, rotations):
+    """pieces after the block is rotated that many times"""
+    if not rotations:
+        return tuple(pieces)
+    return tuple(pieces[-rotations:]) + tuple(pieces[:-rotations])
+
+
+class Search:
+    """Placements of blocks on a board, and the best of them
+
+    weights     Dict of feature weights (default: WEIGHTS); missing
+                features weigh 0
+    depth       1 to look at the falling block only, 2 to also place the
+                preview block on each board it leaves
+
+    The board size and the shortest run that matches are the engine's.
+    evaluated counts the placements simulated.
+    """
+
+    def __init__(self, ncols=NCOLS, nrows=NROWS, block_size=BLOCK_SIZE,
+            min_run=MIN_RUN, weights=None, depth=2):
+        self.ncols, self.nrows = ncols, nrows
+        self.block_size = block_size
+        self.min_run = min_run
+        self.weights = dict(WEIGHTS if weights is None else weights)
+        self.depth = depth
+        self.spawn_col = ncols // 2
+        self.evaluated = 0
+
+    #
+    # MOVES
+    #
+    def scan(self, cols, cells):
+        """Runs of min_run or more through any of the (col, height) cells
+
+        Same as GridBoard.scan_cells(): returns the cells in the runs and
+        their points.
+        """
+        ncols, min_run = self.ncols, self.min_run
+        found = set()
+        seen = set()
+        add_score = 0
+        for c, h in cells:
+            piece = cols[c][h]
+            for dc, dh in STEPS:
+                # Back up to the start of the run through (c, h)
+                sc, sh = c - dc, h - dh
+                while 0 <= sc < ncols and 0 <= sh < len(cols[sc]) and \
+                        cols[sc][sh] == piece:
+                    sc, sh = sc - dc, sh - dh
+                sc, sh = sc + dc, sh + dh
+                if (dc, dh, sc, sh) in seen: continue
+                seen.add((dc, dh, sc, sh))
+
+                # ..and walk forward to its end
+                n = 1
+                ec, eh = sc + dc, sh + dh
+                while 0 <= ec < ncols and 0 <= eh < len(cols[ec]) and \
+                        cols[ec][eh] == piece:
+                    n += 1
+                    ec, eh = ec + dc, eh + dh
+
+                if n >= min_run:
+                    add_score += points(n, min_run)
+                    found.update((sc + i*dc, sh + i*dh) for i in range(n))
+        return found, add_score
+
+    def delete(self, cols, cells):
+        """Remove the cells and let the jewels above fall
+
+        Returns the new columns and the cells of the jewels that fell.
+        """
+        heights = {}
+        for c, h in cells:
+            heights.setdefault(c, set()).add(h)
+
+        cols = list(cols)
+        moved = []
+        for c, hs in heights.items():
+            col = cols[c]
+            cols[c] = col = tuple(p for h, p in enumerate(col) \
+                    if h not in hs)
+            moved.extend((c, h) for h in range(min(hs), len(col)))
+        return tuple(cols), moved
+
+    def cascade(self, cols, cells, iteration=1):
+        """Clear the runs through the cells, and those that follow
+
+        Returns the final columns and the points scored, doubling with
+        every step of the cascade as in Engine.calc_points().
+        """
+        total = 0
+        while cells:
+            found, add_score = self.scan(cols, cells)
+            if not found: break
+            total += add_score << (iteration-1)
+            cols, cells = self.delete(cols, found)
+            iteration += 1
+        return cols, total
+
+    def place(self, cols, col, pieces):
+        """Drop a (non-wild) block of pieces, top first, into col
+
+        Returns the columns after the cascade, and the points scored.
+        """
+        self.evaluated += 1
+        column = cols[col]
+        h = len(column)
+        cols = cols[:col] + (column + pieces[::-1],) + cols[col+1:]
+        return self.cascade(cols, [(col, h + i) \
+                for i in range(len(pieces))])
+
+    def place_wild(self, cols, col):
+        """Drop a wild block into col
+
+        It clears every jewel of the colour it lands on (see
+        Engine.process_wildpiece_drop()).
+        """
+        self.evaluated += 1
+        column = cols[col]
+        if not column:
+            return cols, JEWEL_SCORE
+        piece = column[-1]
+        cells = [(c, h) for c in range(self.ncols) \
+                for h, p in enumerate(cols[c]) if p == piece]
+        cols, moved = self.delete(cols, cells)
+        cols, total = self.cascade(cols, moved)
+        return cols, JEWEL_SCORE + total
+
+    def reachable(self, cols, col, row=0):
+        """Columns a block at (row, col) can get to
+
+        A block moves sideways only into a column with room beside its
+        bottom jewel.
+        """
+        room = self.nrows - (row + self.block_size - 1)
+        if len(cols[col]) >= room:
+            return []
+        left = col
+        while left > 0 and len(cols[left-1]) < room:
+            left -= 1
+        right = col
+        while right < self.ncols-1 and len(cols[right+1]) < room:
+            right += 1
+        return range(left, right+1)
+
+    def placements(self, cols, pieces, iswild, col=None, row=0):
+        """Every placement of a block at (row, col)
+
+        Yields (rotations, col, columns, points); rotations is always 0
+        for a wild block, and rotations that give the same pieces are left
+        out. col defaults to the column blocks come in at.
+        """
+        if col is None:
+            col = self.spawn_col
+        if iswild:
+            for c in self.reachable(cols, col, row):
+                yield (0, c) + self.place_wild(cols, c)
+            return
+
+        orders = {}
+        for rotations in range(len(pieces)):
+            orders.setdefault(rotated(pieces, rotations), rotations)
+        for c in self.reachable(cols, col, row):
+            for order, rotations in orders.items():
+                yield (rotations, c) + self.place(cols, c, order)
+
+    #
+    # EVALUATION
+    #
+    def features(self, cols):
+        """Features of a board, by name (see WEIGHTS)"""
+        heights = [len(col) for col in cols]
+        center = heights[self.spawn_col]
+        pairs = 0
+        for c, col in enumerate(cols):
+            if not col: continue
+            h = len(col) - 1
+            top = col[h]
+            if h and col[h-1] == top:
+                pairs += 1
+            for n in (c-1, c+1):
+                if 0 <= n < self.ncols:
+                    ncol = cols[n]
+                    # Beside it, and diagonally above and below
+                    pairs += sum(1 for nh in (h-1, h, h+1) \
+                            if 0 <= nh < len(ncol) and ncol[nh] == top)
+        return {
+            'height': max(heights),
+            'jewels': sum(heights),
+            'bumpiness': sum(abs(a - b) \
+                    for a, b in zip(heights, heights[1:])),
+            'center': center,
+            'pairs': pairs,
+            'topout': int(center > self.nrows - self.block_size),
+        }
+
+    def evaluate(self, cols, score=0):
+        """Value of a board reached by scoring score points"""
+        w = self.weights
+        value = w.get('points', 0.0) * score
+        for name, x in self.features(cols).items():
+            value += w.get(name, 0.0) * x
+        return value
+
+    #
+    # SEARCH
+    #
+    def best(self, cols, pieces, iswild, preview=None, col=None, row=0):
+        """Best placement of a block at (row, col)
+
+        preview     (pieces, iswild) of the next block, looked at with
+                    depth 2
+
+        Returns (rotations, col, value), or None if the block can't move
+        anywhere. Of equal placements the one nearest col wins.
+        """
+        if col is None:
+            col = self.spawn_col
+        pieces = tuple(pieces)
+        best, best_key = None, None
+        for rotations, c, after, score in self.placements(cols, pieces,
+                iswild, col, row):
+            if preview is not None and self.depth > 1:
+                value = self.best_next(after, score, *preview)
+            else:
+                value = self.evaluate(after, score)
+            key = (value, -abs(c - col), -rotations)
+            if best_key is None or key > best_key:
+                best, best_key = (rotations, c, value), key
+        return best
+
+    def best_next(self, cols, score, pieces, iswild):
+        """Value of a board, with the next block placed as well as it can be
+
+        A board that leaves the next block nowhere to go is worth what it
+        is, topped out.
+        """
+        values = [self.evaluate(after, score + next_score) \
+                for rotations, c, after, next_score in self.placements(cols,
+                tuple(pieces), iswild)]
+        if not values:
+            return self.evaluate(cols, score)
+        return max(values)
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
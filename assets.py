@@ -0,0 +1,123 @@
+"""
+File:           assets.py
+Description:    Shared textures and sounds
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+Every image and sound is loaded once per process, the first time it's
+asked for, and the same object is handed to every view after that.
+
+Images come from the pack built by pack.py when there is one (and
+USE_PACK is set), and from their PNG files otherwise: also when the pack
+is damaged, or older than any of the PNGs.
+
+"""
+
+import os
+import sys
+
+import arcade
+import PIL.Image
+
+from common import NUM_PIECES, NUM_FLASH
+from pack import Pack, PackError, IMAGE_DIR, PACK_FILE, is_stale
+
+USE_PACK = True
+
+_textures = {}
+_sounds = {}
+_pack = None        # The pack.Pack once opened, False if there's none
+
+
+def image_path(name):
+    return IMAGE_DIR + name
+
+
+def get_pack():
+    global _pack
+    if _pack is None:
+        _pack = False
+        if USE_PACK and os.path.isfile(PACK_FILE):
+            try:
+                if is_stale(PACK_FILE, IMAGE_DIR):
+                    raise PackError('pack is older than the images')
+                _pack = Pack(PACK_FILE)
+            except (OSError, PackError) as e:
+                print('{}: {}; loading the PNGs'.format(PACK_FILE, e),
+                        file=sys.stderr)
+    return _pack or None
+
+
+def image(name):
+    """RGBA PIL image of the image name in IMAGE_DIR"""
+    pack = get_pack()
+    if pack and name in pack:
+        return pack.image(name)
+    return PIL.Image.open(image_path(name)).convert('RGBA')
+
+
+def texture(name):
+    """Texture of the image name in IMAGE_DIR"""
+    t = _textures.get(name)
+    if t is None:
+        pack = get_pack()
+        if pack and name in pack:
+            t = arcade.Texture(image_path(name), pack.image(name))
+        else:
+            t = arcade.load_texture(image_path(name))
+        _textures[name] = t
+    return t
+
+
+def sound(filename):
+    """Sound in filename (which may be a :resources: path)"""
+    s = _sounds.get(filename)
+    if s is None:
+        s = _sounds[filename] = arcade.load_sound(filename)
+    return s
+
+
+def tiled_texture(name, tiles):
+    """Texture of the image name, repeated at each of the tiles
+
+    tiles   (col, row) positions, in units of the image size, with row 0 at
+            the top. The texture is just big enough to hold all of them,
+            and transparent where there's no tile.
+    """
+    key = (name, tuple(sorted(tiles)))
+    t = _textures.get(key)
+    if t is not None:
+        return t
+
+    tile = image(name)
+    w, h = tile.size
+    ncols = max(c for c, r in tiles) + 1
+    nrows = max(r for c, r in tiles) + 1
+    canvas = PIL.Image.new('RGBA', (ncols*w, nrows*h))
+    for c, r in tiles:
+        canvas.paste(tile, (c*w, r*h))
+
+    # arcade caches textures by name, so it has to say what's in the image
+    t = arcade.Texture('{}:{}'.format(name, hash(key[1])), canvas,
+            hit_box_algorithm='None')
+    _textures[key] = t
+    return t
+
+
+def jewel_textures():
+    """Textures for each piece: the wild jewel, then pieces 1..NUM_PIECES"""
+    return [texture('jewel.png')] + \
+            [texture('piece{}.png'.format(i)) for i in range(1, NUM_PIECES+1)]
+
+
+def flash_textures():
+    """Textures for the flash animation, ending in a transparent one"""
+    return [texture('flash{}.png'.format(i)) for i in range(1, NUM_FLASH+1)] + \
+            [texture('trans.png')]
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
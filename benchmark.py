@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+"""
+File:           benchmark.py
+Description:    Benchmarks for the headless engine
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+Usage:
+    python benchmark.py scaling [--drops N] [--sizes 6x14,64x256] [--full]
+    python benchmark.py boards [--drops N] [--scans N] [--sizes 6x14]
+    python benchmark.py scan [--scans N] [--sizes 6x14]
+    python benchmark.py search [--positions N] [--depth 2]
+    python benchmark.py snapshot [--copies N]
+    python benchmark.py startup [--runs N] [--frame]
+
+or through pyjewel (also when frozen by PyInstaller):
+    pyjewel benchmark startup --frame
+
+"""
+
+import os
+import sys
+import copy
+import time
+import random
+import argparse
+import subprocess
+from itertools import groupby
+
+import ai
+import matching
+from matching import points
+from engine import Engine, ACTIONS
+from board import GridBoard, BitBoard
+from common import NUM_PIECES, MIN_RUN
+
+DEFAULT_SIZES = '6x14,8x20,16x64,32x128,64x256'
+
+
+def parse_sizes(sizes):
+    """'6x14,64x256' -> [(6, 14), (64, 256)] as (ncols, nrows)"""
+    return [tuple(int(n) for n in size.split('x')) \
+            for size in sizes.split(',')]
+
+
+def random_drops(engine, ndrops, rng):
+    """Drop ndrops blocks into random columns, resolving every cascade
+
+    Blocks are put straight into their column instead of being steered
+    there, so that only the landing and cascade work is timed.
+    Returns the time taken in seconds.
+    """
+    start = time.perf_counter()
+    for i in range(ndrops):
+        if engine.game_over:
+            engine.new_game()
+
+        col = rng.randrange(engine.ncols)
+        if not engine.board.is_empty(engine.block_size-1, col):
+            # Column is full: clear the board as if topped out
+            engine.lose_life()
+            continue
+
+        engine.spawn().col = col
+        engine.drop()
+        engine.settle()
+    return time.perf_counter() - start
+
+
+def bench_scaling(args):
+    """Per-drop cost against board size"""
+    modes = [('incremental', True)]
+    if args.full:
+        modes.append(('full scan', False))
+
+    print('{:>9} {:>12} {:>12} {:>10}'.format('board', 'mode', 'us/drop',
+            'score'))
+    for ncols, nrows in parse_sizes(args.sizes):
+        for name, incremental in modes:
+            engine = Engine(random.Random(args.seed), ncols=ncols,
+                    nrows=nrows, incremental=incremental)
+            elapsed = random_drops(engine, args.drops,
+                    random.Random(args.seed))
+            print('{:>9} {:>12} {:>12.1f} {:>10}'.format(
+                    '{}x{}'.format(ncols, nrows), name,
+                    1e6*elapsed/args.drops, engine.score))
+
+
+def random_board(board_class, nrows, ncols, rng):
+    """Board filled with random pieces, for timing scans"""
+    board = board_class(nrows, ncols)
+    for r in range(nrows):
+        for c in range(ncols):
+            board.set(r, c, rng.randrange(NUM_PIECES)+1)
+    return board
+
+
+def legacy_scan(self, min_run=MIN_RUN):
+    """GridBoard.scan() as it was, walking each line with computed indices"""
+    # https://stackoverflow.com/questions/44790869/
+    # find-indexes-of-repeated-elements-in-an-array-python-numpy
+    # /44792205#44792205
+    def find_consecutive_ranges(lst, n=min_run):
+        # Elements of the input list are of the form (v, k)
+        # Return a list of list of k's of >=n runs of the same 'v'
+
+        # Identify consecutive groups of same value (value != 0)
+        groups = [list(g) for k, g in groupby(lst, lambda x: x[0]) if k]
+        # Pick only groups of length >= n
+        len3reps = [g for g in groups if len(g) >= n]
+        # Extract list of list of k's
+        return [[x[1] for x in len3rep] for len3rep in len3reps]
+
+    board = self
+    nrows, ncols = self.nrows, self.ncols
+    add_score = 0
+    indices = set()     # Needs to be set to avoid duplicates
+
+    # Check consecutive matching blocks horizontally
+    for r in range(nrows):
+        # For this row, create ordered list of (value, cell)
+        L = [(board[r][c], (r, c)) for c in range(ncols)]
+        for cell_range in find_consecutive_ranges(L):
+            add_score += points(len(cell_range), min_run)
+            indices.update(cell_range)
+
+    # Check consecutive matching blocks vertically
+    for c in range(ncols):
+        # For this row, create ordered list of (value, cell)
+        L = [(board[r][c], (r, c)) for r in range(nrows)]
+        for cell_range in find_consecutive_ranges(L):
+            add_score += points(len(cell_range), min_run)
+            indices.update(cell_range)
+
+    # Check consecutive matching blocks diagonally right
+    # https://www.geeksforgeeks.org/zigzag-or-diagonal-traversal-of-matrix/
+    for line in range(min_run, nrows+ncols-min_run+1):
+        # Get column index of first element in this line
+        # index is 0 for line 0, and (line - ROW) for a given line
+        start_col = max(0, line - nrows)
+        count = min(line, (ncols - start_col), nrows)
+        L = [(board[min(nrows, line) - j - 1][start_col+j],
+                (min(nrows, line) - j - 1, start_col+j)) \
+                for j in range(count)]
+        for cell_range in find_consecutive_ranges(L):
+            add_score += points(len(cell_range), min_run)
+            indices.update(cell_range)
+
+    # Check consecutive matching blocks diagonally left
+    for line in range(min_run, nrows+ncols-min_run+1):
+        # Get column index of first element in this line
+        # index is 0 for line 0, and (line - ROW) for a given line
+        start_col = max(0, line - nrows)
+        count = min(line, (ncols - start_col), nrows)
+        L = [(board[min(nrows, line) - j - 1][ncols-start_col-j-1],
+                (min(nrows, line) - j - 1, ncols-start_col-j-1)) \
+                for j in range(count)]
+        for cell_range in find_consecutive_ranges(L):
+            add_score += points(len(cell_range), min_run)
+            indices.update(cell_range)
+
+    return indices, add_score
+
+
+def bench_scan(args):
+    """Full board scans: computed lines against precomputed line tables"""
+    def numpy_scan(board, min_run):
+        mask, add_score = matching.find_matches_np(board, min_run)
+        return matching.match_cells(mask), add_score
+
+    scans = [('legacy', legacy_scan), ('tables', GridBoard.scan)]
+    if matching.np is not None:
+        scans.append(('numpy', numpy_scan))
+
+    print('{:>9} {:>8} {:>12}'.format('board', 'scan', 'us/scan'))
+    for ncols, nrows in parse_sizes(args.sizes):
+        rng = random.Random(args.seed)
+        board = random_board(GridBoard, nrows, ncols, rng)
+        # Every scan must find the same cells and points
+        expected = board.scan(MIN_RUN)
+        for name, scan in scans:
+            if scan(board, MIN_RUN) != expected:
+                raise AssertionError('{} scan differs'.format(name))
+            start = time.perf_counter()
+            for i in range(args.scans):
+                scan(board, MIN_RUN)
+            elapsed = time.perf_counter() - start
+            print('{:>9} {:>8} {:>12.1f}'.format('{}x{}'.format(ncols, nrows),
+                    name, 1e6*elapsed/args.scans))
+
+
+def bench_search(args):
+    """Placements searched per second by the bot's lookahead"""
+    # Positions from random play, each with a block just come in
+    rng = random.Random(args.seed)
+    engine = Engine(random.Random(args.seed))
+    positions = []
+    while len(positions) < args.positions:
+        if engine.game_over:
+            engine.new_game()
+        engine.step(rng.choice(ACTIONS))
+        block, preview = engine.falling_block, engine.preview_block
+        if block.ismoving and block.row == 0:
+            positions.append((ai.from_board(engine.board), block.pieces,
+                    block.iswild, (preview.pieces, preview.iswild)))
+
+    print('{:>6} {:>12} {:>14} {:>12}'.format('depth', 'placements',
+            'placements/s', 'ms/move'))
+    for depth in range(1, args.depth+1):
+        search = ai.Search(depth=depth)
+        start = time.perf_counter()
+        for cols, pieces, iswild, preview in positions:
+            search.best(cols, pieces, iswild, preview)
+        elapsed = time.perf_counter() - start
+        print('{:>6} {:>12} {:>14.0f} {:>12.2f}'.format(depth,
+                search.evaluated, search.evaluated/elapsed,
+                1000*elapsed/len(positions)))
+
+
+def bench_snapshot(args):
+    """Branching a game: copy.deepcopy() against snapshot() and restore()"""
+    print('{:>9} {:>6} {:>12} {:>12} {:>12}'.format('board', 'type',
+            'us/deepcopy', 'us/snapshot', 'us/restore'))
+    for bitboard, name in ((False, 'grid'), (True, 'bit')):
+        rng = random.Random(args.seed)
+        engine = Engine(random.Random(args.seed), bitboard=bitboard)
+        while engine.blocks < 20 and not engine.game_over:
+            engine.step(rng.choice(ACTIONS))
+
+        times = []
+        for func in (lambda: copy.deepcopy(engine), engine.snapshot):
+            start = time.perf_counter()
+            for i in range(args.copies):
+                func()
+            times.append(time.perf_counter() - start)
+        snapshot = engine.snapshot()
+        start = time.perf_counter()
+        for i in range(args.copies):
+            engine.restore(snapshot)
+        times.append(time.perf_counter() - start)
+
+        print('{:>9} {:>6} {:>12.1f} {:>12.1f} {:>12.1f}'.format(
+                '{}x{}'.format(engine.ncols, engine.nrows), name,
+                *(1e6*t/args.copies for t in times)))
+
+
+def bench_boards(args):
+    """GridBoard against BitBoard"""
+    boards = [('grid', GridBoard, False), ('bit', BitBoard, True)]
+
+    print('{:>9} {:>6} {:>12} {:>12} {:>10}'.format('board', 'type',
+            'us/drop', 'us/scan', 'score'))
+    for ncols, nrows in parse_sizes(args.sizes):
+        for name, board_class, bitboard in boards:
+            engine = Engine(random.Random(args.seed), ncols=ncols,
+                    nrows=nrows, bitboard=bitboard)
+            drop_time = random_drops(engine, args.drops,
+                    random.Random(args.seed))
+
+            # Full scans of a full board
+            rng = random.Random(args.seed)
+            board = random_board(board_class, nrows, ncols, rng)
+            start = time.perf_counter()
+            for i in range(args.scans):
+                board.scan()
+            scan_time = time.perf_counter() - start
+
+            print('{:>9} {:>6} {:>12.1f} {:>12.1f} {:>10}'.format(
+                    '{}x{}'.format(ncols, nrows), name,
+                    1e6*drop_time/args.drops, 1e6*scan_time/args.scans,
+                    engine.score))
+
+
+def first_frame_time(use_pack):
+    """Seconds from starting pyjewel to its first frame of the game"""
+    if getattr(sys, 'frozen', False):
+        command = [sys.executable]
+    else:
+        command = [sys.executable, os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), 'pyjewel.py')]
+    command += ['benchmark', 'first-frame']
+    if not use_pack:
+        command.append('--no-pack')
+
+    start = time.perf_counter()
+    subprocess.run(command, check=True)
+    return time.perf_counter() - start
+
+
+def first_frame(args):
+    """Open the window, draw one frame of the game and quit"""
+    import assets
+    assets.USE_PACK = not args.no_pack
+
+    import pyjewel
+    window = pyjewel.make_window()
+    window.show_view(window.game_view)
+    window.game_view.on_draw()
+    window.flip()
+    window.ctx.finish()
+    window.close()
+
+
+def bench_startup(args):
+    """Image loading from the PNGs against the pack"""
+    import PIL.Image
+    from pack import Pack, IMAGE_DIR, PACK_FILE
+
+    if not os.path.isfile(PACK_FILE):
+        print('No {}: build it with pack.py'.format(PACK_FILE),
+                file=sys.stderr)
+        return 1
+    names = Pack(PACK_FILE).names()
+
+    def load_pngs():
+        for name in names:
+            PIL.Image.open(IMAGE_DIR + name).convert('RGBA')
+
+    def load_pack():
+        pack = Pack(PACK_FILE)
+        for name in names:
+            pack.image(name)
+
+    print('{} images'.format(len(names)))
+    print('{:>12} {:>12} {:>12}'.format('from', 'ms/load', 'ms/frame'))
+    for name, load, use_pack in (('png', load_pngs, False),
+            ('pack', load_pack, True)):
+        start = time.perf_counter()
+        for i in range(args.runs):
+            load()
+        load_time = (time.perf_counter() - start) / args.runs
+
+        frame_time = ''
+        if args.frame:
+            times = sorted(first_frame_time(use_pack) \
+                    for i in range(args.runs))
+            frame_time = '{:.1f}'.format(1000*times[len(times)//2])
+        print('{:>12} {:>12.2f} {:>12}'.format(name, 1000*load_time,
+                frame_time))
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog,
+            description='pyjewel benchmarks')
+    parser.add_argument('--seed', type=int, default=1)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('scaling', help=bench_scaling.__doc__)
+    p.add_argument('--drops', type=int, default=1000,
+            help='blocks dropped per board size')
+    p.add_argument('--sizes', default=DEFAULT_SIZES,
+            help='comma-separated board sizes, as COLSxROWS')
+    p.add_argument('--full', action='store_true',
+            help='also time the full rescan of the board')
+    p.set_defaults(func=bench_scaling)
+
+    p = subparsers.add_parser('boards', help=bench_boards.__doc__)
+    p.add_argument('--drops', type=int, default=1000,
+            help='blocks dropped per board size and type')
+    p.add_argument('--scans', type=int, default=100,
+            help='full scans of a random full board')
+    p.add_argument('--sizes', default='6x14,16x64,64x256',
+            help='comma-separated board sizes, as COLSxROWS')
+    p.set_defaults(func=bench_boards)
+
+    p = subparsers.add_parser('scan', help=bench_scan.__doc__)
+    p.add_argument('--scans', type=int, default=200,
+            help='full scans of a random full board')
+    p.add_argument('--sizes', default='6x14,16x64,64x256',
+            help='comma-separated board sizes, as COLSxROWS')
+    p.set_defaults(func=bench_scan)
+
+    p = subparsers.add_parser('search', help=bench_search.__doc__)
+    p.add_argument('--positions', type=int, default=100,
+            help='positions searched')
+    p.add_argument('--depth', type=int, default=2,
+            help='deepest lookahead timed')
+    p.set_defaults(func=bench_search)
+
+    p = subparsers.add_parser('snapshot', help=bench_snapshot.__doc__)
+    p.add_argument('--copies', type=int, default=2000,
+            help='copies (snapshots, restores) timed')
+    p.set_defaults(func=bench_snapshot)
+
+    p = subparsers.add_parser('startup', help=bench_startup.__doc__)
+    p.add_argument('--runs', type=int, default=10,
+            help='loads (and first frames) timed from each source')
+    p.add_argument('--frame', action='store_true',
+            help='also time from starting pyjewel to its first game frame '
+            '(median of the runs; opens a window)')
+    p.set_defaults(func=bench_startup)
+
+    # Run by bench_startup() in a new process
+    p = subparsers.add_parser('first-frame', help=first_frame.__doc__)
+    p.add_argument('--no-pack', action='store_true')
+    p.set_defaults(func=first_frame)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
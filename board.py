@@ -0,0 +1,346 @@
+"""
+File:           board.py
+Description:    Playfield representations for the engine
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+Two interchangeable boards, with the same methods:
+    GridBoard   list of rows of pieces (0 is an empty cell), so that
+                board[r][c] also works
+    BitBoard    one bitmask per piece, as Python ints
+
+Both keep a 64-bit Zobrist hash of their contents in board.hash, updated as
+cells are set: the XOR of a random key for each (cell, piece) on the board.
+Writes must go through set() (or compact()) to keep it right.
+
+snapshot() returns the contents as an immutable tuple, ending with the
+hash, and restore() puts them back.
+
+"""
+
+import random
+from functools import lru_cache
+from itertools import chain, groupby
+from operator import itemgetter
+
+from common import NCOLS, NROWS, NUM_PIECES, MIN_RUN
+from matching import DIRECTIONS, points
+
+
+ZOBRIST_SEED = 0x70796A6577656C      # Same keys in every process
+
+def popcount(x):
+    return bin(x).count('1')
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(nrows, ncols):
+    """Zobrist key of each piece in each cell
+
+    keys[r*ncols + c][piece]; an empty cell's key is 0, so the hash of the
+    empty board is 0.
+    """
+    rng = random.Random(ZOBRIST_SEED)
+    return tuple((0,) + tuple(rng.getrandbits(64) for p in range(NUM_PIECES)) \
+            for i in range(nrows*ncols))
+
+
+@lru_cache(maxsize=None)
+def scan_lines(nrows, ncols, min_run=MIN_RUN):
+    """Every line across the board that can hold a run of min_run
+
+    Lines run in each of the DIRECTIONS, from edge to edge. Worked out once
+    per board geometry; each line is (gather, cells), where gather picks
+    the pieces of its cells, in order, out of the board flattened by rows,
+    and cells are their (row, col).
+    """
+    lines = []
+    for dr, dc in DIRECTIONS:
+        for r in range(nrows):
+            for c in range(ncols):
+                # A line starts at a cell with no cell before it
+                if 0 <= r-dr < nrows and 0 <= c-dc < ncols: continue
+                cells = []
+                lr, lc = r, c
+                while 0 <= lr < nrows and 0 <= lc < ncols:
+                    cells.append((lr, lc))
+                    lr, lc = lr+dr, lc+dc
+                if len(cells) >= min_run:
+                    lines.append((itemgetter(*(lr*ncols + lc \
+                            for lr, lc in cells)), tuple(cells)))
+    return tuple(lines)
+
+
+class GridBoard(list):
+    """Board as a list of rows of pieces"""
+
+    def __init__(self, nrows=NROWS, ncols=NCOLS):
+        super().__init__([0]*ncols for j in range(nrows))
+        self.nrows, self.ncols = nrows, ncols
+        self.keys = zobrist_keys(nrows, ncols)
+        self.hash = 0
+
+    def get(self, r, c):
+        return self[r][c]
+
+    def set(self, r, c, piece):
+        row = self[r]
+        key = self.keys[r*self.ncols + c]
+        self.hash ^= key[row[c]] ^ key[piece]
+        row[c] = piece
+
+    def is_empty(self, r, c):
+        return not self[r][c]
+
+    def cells_of(self, piece):
+        """All the (row, col) cells holding piece"""
+        return [(r, c) for r in range(self.nrows) for c in range(self.ncols) \
+                if self[r][c] == piece]
+
+    def tolist(self):
+        """List of rows (the board itself)"""
+        return self
+
+    def snapshot(self):
+        """(pieces packed in bytes, row by row, hash)"""
+        return bytes(chain.from_iterable(self)), self.hash
+
+    def restore(self, snapshot):
+        data, self.hash = snapshot
+        n = self.ncols
+        for r, row in enumerate(self):
+            row[:] = data[r*n:(r+1)*n]
+
+    def compact(self, holes=None):
+        """Let jewels fall into the empty cells below them
+
+        Each column is compacted in a single sweep from the bottom up, so
+        every jewel moves once, straight to its final row.
+
+        holes   {col: row} of the lowest emptied cell in each column that
+                changed. Only these columns are swept, from that row up.
+                Default: sweep the whole board.
+
+        Returns the moves, as a list of ((row, col), new_row) with the
+        bottom-most move of each column first, and the sets of columns and
+        rows that changed.
+        """
+        moves = []
+        cols, rows = set(), set()
+        ncols, keys = self.ncols, self.keys
+        if holes is None:
+            holes = dict.fromkeys(range(ncols), self.nrows-1)
+
+        for c, nr in holes.items():
+            # nr: lowest free row in this column
+            for r in range(nr, -1, -1):
+                piece = self[r][c]
+                if not piece: continue
+                if r != nr:
+                    self[nr][c] = piece
+                    self[r][c] = 0
+                    self.hash ^= keys[nr*ncols + c][piece] ^ \
+                            keys[r*ncols + c][piece]
+                    moves.append(((r, c), nr))
+                    rows.add(r)
+                    rows.add(nr)
+                nr -= 1
+            if moves and moves[-1][0][1] == c:
+                cols.add(c)
+        return moves, cols, rows
+
+    def scan_cells(self, cells, min_run=MIN_RUN):
+        """Find the runs of min_run or more through any of the given cells"""
+        nrows, ncols = self.nrows, self.ncols
+        add_score = 0
+        indices = set()
+        seen = set()        # Runs already found, as (direction, start)
+
+        for r, c in cells:
+            piece = self[r][c]
+            if not piece: continue
+            for dr, dc in DIRECTIONS:
+                # Back up to the start of the run through (r, c)
+                sr, sc = r, c
+                while 0 <= sr-dr < nrows and 0 <= sc-dc < ncols and \
+                        self[sr-dr][sc-dc] == piece:
+                    sr, sc = sr-dr, sc-dc
+                if (dr, dc, sr, sc) in seen: continue
+                seen.add((dr, dc, sr, sc))
+
+                # ..and walk forward to its end
+                run = [(sr, sc)]
+                er, ec = sr+dr, sc+dc
+                while 0 <= er < nrows and 0 <= ec < ncols and \
+                        self[er][ec] == piece:
+                    run.append((er, ec))
+                    er, ec = er+dr, ec+dc
+
+                if len(run) >= min_run:
+                    add_score += points(len(run), min_run)
+                    indices.update(run)
+
+        return indices, add_score
+
+    def scan(self, min_run=MIN_RUN):
+        """Find all the runs of min_run or more on the board"""
+        flat = list(chain.from_iterable(self))
+        add_score = 0
+        indices = set()     # Needs to be set to avoid duplicates
+
+        for gather, cells in scan_lines(self.nrows, self.ncols, min_run):
+            # Groups of consecutive matching pieces along the line
+            i = 0
+            for piece, group in groupby(gather(flat)):
+                n = len(tuple(group))
+                if piece and n >= min_run:
+                    add_score += points(n, min_run)
+                    indices.update(cells[i:i+n])
+                i += n
+
+        return indices, add_score
+
+
+class BitBoard:
+    """Board as one bitmask per piece
+
+    Cell (r, c) is bit r*stride + c, where stride is ncols+1: the extra
+    column is always empty, so that shifting a row (or a diagonal) off its
+    end can't wrap into the next row. A run of three of a piece along a
+    line with step s is then mask & mask >> s & mask >> 2s.
+
+    Only pieces 1..NUM_PIECES are stored; the wild piece never lands.
+    """
+
+    def __init__(self, nrows=NROWS, ncols=NCOLS):
+        self.nrows, self.ncols = nrows, ncols
+        self.stride = ncols + 1
+        self.masks = [0] * (NUM_PIECES+1)   # masks[0] is unused
+        self.occupied = 0
+        self.keys = zobrist_keys(nrows, ncols)
+        self.hash = 0
+
+        # Shift for one step along each of the DIRECTIONS
+        self.shifts = [dr*self.stride + dc for dr, dc in DIRECTIONS]
+
+    def bit(self, r, c):
+        return 1 << (r*self.stride + c)
+
+    def get(self, r, c):
+        b = self.bit(r, c)
+        if not self.occupied & b:
+            return 0
+        for piece in range(1, NUM_PIECES+1):
+            if self.masks[piece] & b:
+                return piece
+
+    def set(self, r, c, piece):
+        b = self.bit(r, c)
+        key = self.keys[r*self.ncols + c]
+        if self.occupied & b:
+            for p in range(1, NUM_PIECES+1):
+                if self.masks[p] & b:
+                    self.masks[p] &= ~b
+                    self.hash ^= key[p]
+            self.occupied &= ~b
+        self.hash ^= key[piece]
+        if piece:
+            self.masks[piece] |= b
+            self.occupied |= b
+
+    def is_empty(self, r, c):
+        return not (self.occupied >> (r*self.stride + c)) & 1
+
+    def __getitem__(self, r):
+        # Read-only row, for code written for GridBoard
+        return tuple(self.get(r, c) for c in range(self.ncols))
+
+    def cells(self, mask):
+        """(row, col) cells of the set bits in mask"""
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(divmod(low.bit_length()-1, self.stride))
+            mask ^= low
+        return cells
+
+    def cells_of(self, piece):
+        return self.cells(self.masks[piece])
+
+    def tolist(self):
+        return [list(self[r]) for r in range(self.nrows)]
+
+    def snapshot(self):
+        """(masks, occupied, hash)"""
+        return tuple(self.masks), self.occupied, self.hash
+
+    def restore(self, snapshot):
+        masks, self.occupied, self.hash = snapshot
+        self.masks = list(masks)
+
+    def compact(self, holes=None):
+        """Let jewels fall into the empty cells below them
+
+        Same as GridBoard.compact()
+        """
+        moves = []
+        cols, rows = set(), set()
+        if holes is None:
+            holes = dict.fromkeys(range(self.ncols), self.nrows-1)
+
+        for c, nr in holes.items():
+            for r in range(nr, -1, -1):
+                if self.is_empty(r, c): continue
+                if r != nr:
+                    self.set(nr, c, self.get(r, c))
+                    self.set(r, c, 0)
+                    moves.append(((r, c), nr))
+                    rows.add(r)
+                    rows.add(nr)
+                nr -= 1
+            if moves and moves[-1][0][1] == c:
+                cols.add(c)
+        return moves, cols, rows
+
+    def scan_pieces(self, pieces, min_run=MIN_RUN):
+        """Find all the runs of min_run or more of the given pieces"""
+        add_score = 0
+        covered = 0
+        for piece in pieces:
+            m = self.masks[piece]
+            if not m: continue
+            for s in self.shifts:
+                # Windows: bits where min_run cells in a row hold piece
+                w = m
+                for i in range(1, min_run):
+                    w &= m >> (i*s)
+                if not w: continue
+
+                for i in range(min_run):
+                    covered |= w << (i*s)
+                # A run starts with a window that isn't preceded by another
+                runs = w & ~(w << s)
+                add_score += (points(min_run, min_run)//2) * \
+                        (popcount(w) + popcount(runs))
+
+        return set(self.cells(covered)), add_score
+
+    def scan_cells(self, cells, min_run=MIN_RUN):
+        """Find the runs of min_run or more through any of the given cells
+
+        Scans the whole board, but only for the pieces in those cells; any
+        new run is made of one of them.
+        """
+        return self.scan_pieces({self.get(r, c) for r, c in cells} - {0},
+                min_run)
+
+    def scan(self, min_run=MIN_RUN):
+        """Find all the runs of min_run or more on the board"""
+        return self.scan_pieces(range(1, NUM_PIECES+1), min_run)
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -0,0 +1,72 @@
+"""
+File:           cache.py
+Description:    Bounded LRU cache with statistics
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+Used by the engine as a transposition table: a landed board's Zobrist hash
+maps to what its cascade does (see Engine.settle()).
+
+"""
+
+from collections import OrderedDict
+
+SETTLE_CACHE_SIZE = 1 << 16     # Entries
+
+
+class LRUCache:
+    """Mapping of at most maxsize entries, dropping the least recently used
+
+    Counts the hits and misses of get(), and the entries evicted.
+    """
+
+    def __init__(self, maxsize=SETTLE_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        data = self.data
+        if key in data:
+            data.move_to_end(key)
+        elif len(data) >= self.maxsize:
+            data.popitem(last=False)
+            self.evictions += 1
+        data[key] = value
+
+    def clear(self):
+        self.data.clear()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {'size': len(self.data), 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -13,13 +13,14 @@ License:        GPL (See LICENSE file for details)
 
 """
 
-import arcade
+from scheduler import scheduler as default_scheduler
 
 SCREEN_WIDTH = 650
 SCREEN_HEIGHT = 728
 SCREEN_TITLE = 'pyjewel'
 
 BLOCK_SIZE = 3
+MIN_RUN = 3         # Shortest run of matching jewels that scores
 NUM_PIECES = 6      # 1: red, 2: green, 3: orange, 4: blue, 5: cyan, 6: yellow
 WILD_PIECE = 0      # 0: jewel (white)
 PIECES_PER_STAGE = 50
@@ -35,6 +36,12 @@ MAX_STAGE = 25
 NCOLS = 6
 NROWS = 14
 
+# Game tick (seconds) for each stage
+SPEEDS = [ 1.500, 1.250, 1.000, 0.750, 0.500, 0.250, 0.2375,
+        0.2250, 0.2125, 0.2000, 0.1875, 0.1750, 0.1625, 0.1500,
+        0.1375, 0.1250, 0.1125, 0.1000, 0.0875, 0.0750, 0.0625,
+        0.0500, 0.0375, 0.0250, 0.0125, 0.0000, 0.0000]
+
 MARGIN_X = 10
 MARGIN_Y = 10
 
@@ -76,35 +83,78 @@ FLASH_JFRAMES = 3
 FLASH_TFRAMES = 3
 FLASH_DELAY = 4*FLASH_TIMER*(FLASH_JFRAMES + NUM_FLASH + FLASH_TFRAMES)/1000
 
+# Shortest timer tick, in seconds: durations of 0.0 (the top SPEEDS) tick
+# at this rate, whatever the frame rate
+MIN_DURATION = 1/60
+# Most ticks a timer runs in one frame; any more time owed is dropped, so
+# that a slow frame can't make the next one slower still
+MAX_STEPS = 8
+
+
 class Timer:
-    def __init__(self, duration, callback):
+    """Fixed-step timer, run by the scheduler the views share
+
+    While started, callback(duration) is called once for every full
+    duration that passes on the scheduler's clock, whatever the frame rate.
+    """
+    def __init__(self, duration, callback, max_steps=MAX_STEPS,
+            scheduler=None):
         self._duration = duration   # Duration is in seconds
-        self.elapsed_time = 0
+        self.elapsed_time = 0       # Into the current tick, when stopped
         self._debug = False
-        self.active = False
         self.callback = callback
+        self.max_steps = max_steps
+        if scheduler is None:
+            scheduler = default_scheduler
+        self.scheduler = scheduler
+        self.handle = None          # scheduler.Handle, while started
 
     def debug(self):
         self._debug = True
 
-    def update(self, delta_time):
-        if not self.active: return
+    @property
+    def active(self):
+        return self.handle is not None
+
+    def tick(self):
+        self.callback(self.step)
+
+    @property
+    def step(self):
+        """Time between ticks"""
+        return max(self._duration, MIN_DURATION)
 
-        self.elapsed_time += delta_time
-        if self.elapsed_time >= self._duration:
-            self.elapsed_time -= self._duration
-            self.callback(delta_time)
+    @property
+    def elapsed(self):
+        """Time since the last tick"""
+        if self.handle is None:
+            return self.elapsed_time
+        elapsed = self.step - (self.handle.time - self.scheduler.now)
+        if elapsed >= self.step:
+            # During the callback, the handle still has this tick's time
+            elapsed %= self.step
+        return max(0.0, elapsed)
 
     def reset(self):
         self.elapsed_time = 0
+        if self.active:
+            self.stop()
+            self.elapsed_time = 0
+            self.start()
 
     def stop(self):
         if self._debug: print('Timer stopped')
-        self.active = False
+        if self.handle is not None:
+            self.elapsed_time = self.elapsed
+            self.handle.cancel()
+            self.handle = None
 
     def start(self):
         if self._debug: print('Timer started')
-        self.active = True
+        if self.handle is None:
+            self.handle = self.scheduler.call_every(self.step, self.tick,
+                    first=self.step - self.elapsed_time,
+                    max_steps=self.max_steps)
 
     @property
     def duration(self):
@@ -115,6 +165,10 @@ class Timer:
         """Update timer duration"""
         self._duration = new_duration
         self.elapsed_time = 0
+        if self.active:
+            self.stop()
+            self.elapsed_time = 0
+            self.start()
 
 
 def key_handler(cview, key, modifiers):
@@ -128,6 +182,9 @@ def key_handler(cview, key, modifiers):
             key {int} == which key was pressed
             modifiers {int} -- which modifers were pressed
     """
+    # Imported here so the headless engine can use this module without arcade
+    import arcade
+
     if key == arcade.key.SPACE or key == arcade.key.S:
         cview.window.show_view(cview.window.game_view)
     elif key == arcade.key.H:
@@ -0,0 +1,591 @@
+"""
+File:           engine.py
+Description:    Headless game engine (the rules of the game, without arcade)
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+The engine holds the board, the falling and preview blocks, and the
+score/stage/lives bookkeeping. It needs no window, no textures and no clock:
+GameView drives it from its timers and animates the result, while bots and
+simulations call step() directly, which resolves cascades immediately.
+
+"""
+
+import random
+from itertools import chain
+from collections import namedtuple
+
+import matching
+from matching import points
+from board import GridBoard, BitBoard
+from common import SPEEDS
+from common import NCOLS, NROWS
+from common import BLOCK_SIZE, NUM_PIECES, WILD_PIECE
+from common import PIECES_PER_STAGE, AVG_BLOCKS_BETWEEN_JEWELS
+from common import JEWEL_SCORE, DROP_POINTS, INITIAL_LIVES, MAX_STAGE
+from common import MIN_RUN
+
+# Inputs accepted by Engine.apply() and Engine.step()
+NOOP = 0
+LEFT = 1
+RIGHT = 2
+ROTATE = 3
+DROP = 4
+ACTIONS = (NOOP, LEFT, RIGHT, ROTATE, DROP)
+EXIT = 5            # Player gave up; not one of the ACTIONS a bot picks from
+
+# Results of Engine.advance()
+MOVED = 0
+LANDED = 1
+TOPPED_OUT = 2
+SPAWNED = 3
+
+# Engine attributes kept in a Snapshot, besides the board, blocks and RNG
+STATE = ('seed', 'points', 'showpoints', 'mult', 'showmult', 'score',
+        'iteration', 'lives', 'stage', 'speed', 'rest', 'game_over', 'ticks',
+        'blocks', 'depth')
+
+
+class Snapshot(namedtuple('Snapshot',
+        'board state falling preview rng dirty')):
+    """The state of a game, from Engine.snapshot()
+
+    board       board.snapshot() (which ends with its hash)
+    state       Values of the STATE attributes
+    falling     Block.snapshot() of the falling block, or None when it's
+                the preview block
+    preview     Block.snapshot() of the preview block
+    rng         rng.getstate(), or None if the rng has no state to get
+    dirty       Cells changed since the last scan, as a frozenset
+    """
+    __slots__ = ()
+
+    @property
+    def hash(self):
+        """Zobrist hash of the board"""
+        return self.board[-1]
+
+
+class Block:
+    """A block of block_size jewels, in the preview area or falling
+
+    row, col are the board coords of the top jewel. pieces are listed
+    top to bottom.
+    """
+    __slots__ = ('pieces', 'iswild', 'row', 'col', 'ismoving')
+
+    def __init__(self, rng, block_size=BLOCK_SIZE, ncols=NCOLS,
+            avg_blocks_between_jewels=AVG_BLOCKS_BETWEEN_JEWELS):
+        # Create a random set of jewels for this block
+        if not rng.randrange(avg_blocks_between_jewels):
+            self.iswild = True
+            self.pieces = [WILD_PIECE] * block_size
+        else:
+            self.iswild = False
+            self.pieces = [rng.randrange(NUM_PIECES)+1 \
+                    for i in range(block_size)]
+
+        # Starting board coords of piece (of top jewel, specifically)
+        self.row, self.col = 0, ncols // 2
+        self.ismoving = False
+
+    def rotate(self):
+        """Rotate down the jewels in the block"""
+        self.pieces.insert(0, self.pieces.pop())
+
+    def snapshot(self):
+        return (tuple(self.pieces), self.iswild, self.row, self.col,
+                self.ismoving)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        block = cls.__new__(cls)
+        pieces, block.iswild, block.row, block.col, block.ismoving = snapshot
+        block.pieces = list(pieces)
+        return block
+
+
+class Engine:
+    """Game rules and state, independent of any rendering
+
+    rng         Source of randomness. Anything with randrange() will do.
+    seed        Seed for a random.Random of the engine's own, used when no
+                rng is given (default: a random seed). Kept as self.seed, so
+                the game can be replayed.
+    use_numpy   Scan the whole board with matching.find_matches_np()
+    incremental Only look for matches through cells that changed
+    verify      Check every incremental scan against a full scan
+    bitboard    Keep the board as a board.BitBoard instead of a GridBoard
+    cache       cache.LRUCache of settled cascades, by the hash of the
+                landed board (see settle()). It may be shared by engines
+                with the same board size and min_run.
+
+    The board size, the number of jewels in a block, and the shortest run
+    that matches can be set per game with ncols, nrows, block_size and
+    min_run. So can the game balance: pieces_per_stage,
+    avg_blocks_between_jewels and the speeds table.
+    """
+
+    def __init__(self, rng=None, seed=None, use_numpy=False, incremental=True,
+            verify=False, ncols=NCOLS, nrows=NROWS, block_size=BLOCK_SIZE,
+            min_run=MIN_RUN, bitboard=False, cache=None,
+            pieces_per_stage=PIECES_PER_STAGE,
+            avg_blocks_between_jewels=AVG_BLOCKS_BETWEEN_JEWELS,
+            speeds=SPEEDS):
+        if rng is None:
+            if seed is None:
+                seed = random.getrandbits(64)
+            rng = random.Random(seed)
+        self.rng, self.seed = rng, seed
+        if use_numpy and matching.np is None:
+            raise ImportError('use_numpy needs numpy')
+        if nrows < block_size or ncols < 1 or min_run < 2:
+            raise ValueError('bad board geometry')
+        self.ncols, self.nrows = ncols, nrows
+        self.block_size = block_size
+        self.min_run = min_run
+        self.bitboard = bitboard
+        self.cache = cache
+        self.pieces_per_stage = pieces_per_stage
+        self.avg_blocks_between_jewels = avg_blocks_between_jewels
+        self.speeds = speeds
+        self.use_numpy = use_numpy
+        self.incremental = incremental
+        self.verify = verify
+        self.new_game()
+
+    #
+    # GAME SETUP
+    #
+    def new_board(self):
+        # Create the main (empty) board
+        if self.bitboard:
+            return BitBoard(self.nrows, self.ncols)
+        return GridBoard(self.nrows, self.ncols)
+
+    def new_block(self):
+        return Block(self.rng, self.block_size, self.ncols,
+                self.avg_blocks_between_jewels)
+
+    def new_game(self, seed=None):
+        """Start a new game, reseeding the engine's RNG if seed is given"""
+        if seed is not None:
+            self.rng, self.seed = random.Random(seed), seed
+        self.points = 0
+        self.showpoints = False
+        self.mult = 1
+        self.showmult = False
+        self.score = 0
+        self.iteration = 0
+        self.lives = INITIAL_LIVES
+        self.stage = 1
+        self.speed = self.speeds[self.stage]
+        self.rest = self.pieces_per_stage
+        self.game_over = False
+        self.ticks = 0
+        self.blocks = 0         # Blocks landed
+        self.depth = 0          # Cascade depth of the last landed block
+        self.board = self.new_board()
+        self.dirty = set()      # Cells changed since the last scan
+
+        # Preview block of jewels, which is also the first falling block
+        self.preview_block = self.new_block()
+        self.falling_block = self.preview_block
+
+    def snapshot(self):
+        """The state of the game, as an immutable Snapshot
+
+        Nothing is copied but the board (packed) and the RNG state, so
+        snapshots are cheap enough to take at every step.
+        """
+        fb, pb = self.falling_block, self.preview_block
+        getstate = getattr(self.rng, 'getstate', None)
+        return Snapshot(self.board.snapshot(),
+                tuple(getattr(self, name) for name in STATE),
+                None if fb is pb else fb.snapshot(), pb.snapshot(),
+                getstate() if getstate else None, frozenset(self.dirty))
+
+    def restore(self, snapshot):
+        """Go back to a Snapshot of this engine (or of one like it)"""
+        self.board.restore(snapshot.board)
+        for name, value in zip(STATE, snapshot.state):
+            setattr(self, name, value)
+        self.preview_block = Block.from_snapshot(snapshot.preview)
+        if snapshot.falling is None:
+            self.falling_block = self.preview_block
+        else:
+            self.falling_block = Block.from_snapshot(snapshot.falling)
+        if snapshot.rng is not None:
+            self.rng.setstate(snapshot.rng)
+        self.dirty = set(snapshot.dirty)
+
+    #
+    # SCORING, STAGES AND LIVES
+    #
+    def calc_points(self, points, mult):
+        self.points = points * (1 << (mult-1))
+        self.mult = mult
+        self.showpoints = True
+        self.showmult = True
+
+    def add_score(self):
+        self.score += self.points
+        self.showpoints = False
+        self.showmult = False
+        self.points = 0
+
+    def incr_stage(self):
+        self.stage = 1 + (self.stage % MAX_STAGE)
+        self.speed = self.speeds[self.stage]
+
+    def decr_rest(self, val):
+        self.rest -= val
+        if self.rest <= 0:
+            self.rest += self.pieces_per_stage
+            self.incr_stage()
+
+    def decr_lives(self):
+        self.lives -= 1
+        if not self.lives:
+            self.game_over = True
+
+    def lose_life(self):
+        """Clear the board after it has filled up, and lose a life"""
+        self.board = self.new_board()
+        self.dirty = set()
+        self.decr_lives()
+
+    #
+    # BLOCK MOVEMENT
+    #
+    def rotate(self):
+        if not self.falling_block.ismoving: return False
+        self.falling_block.rotate()
+        return True
+
+    def move_left(self):
+        if not self.falling_block.ismoving: return False
+        fb = self.falling_block
+        fc, fr = fb.col, fb.row + self.block_size - 1
+        if fc > 0 and self.board.is_empty(fr, fc-1):
+            fb.col -= 1
+            return True
+        return False
+
+    def move_right(self):
+        if not self.falling_block.ismoving: return False
+        fb = self.falling_block
+        fc, fr = fb.col, fb.row + self.block_size - 1
+        if fc < self.ncols-1 and self.board.is_empty(fr, fc+1):
+            fb.col += 1
+            return True
+        return False
+
+    def move_down(self):
+        """Move the falling block down one row, or land it
+
+        Returns True if the block landed. A landed (non-wild) block is
+        added to the board; matches are left for the caller to process.
+        """
+        # Have we hit bottom, or one of the fallen jewels
+        fb = self.falling_block
+        fc, fr = fb.col, fb.row + self.block_size - 1
+        if (fr + 1 == self.nrows) or not self.board.is_empty(fr+1, fc):
+            fb.ismoving = False
+            if not fb.iswild:
+                self.add_to_board(fb)
+            return True
+        fb.row += 1
+        return False
+
+    def drop(self):
+        """Drop the falling block until it lands
+
+        Returns the number of rows the block fell, or None if there was
+        no falling block.
+        """
+        if not self.falling_block.ismoving: return None
+
+        cycles = -1
+        while self.falling_block.ismoving:
+            cycles += 1
+            self.move_down()
+
+        if cycles > 0:
+            self.score += DROP_POINTS*cycles
+        return cycles
+
+    def topped_out(self):
+        """Is there no room for a new block?"""
+        return not self.board.is_empty(self.block_size-1, self.ncols//2)
+
+    def spawn(self):
+        """Move preview block to board as a falling block"""
+        self.falling_block = self.preview_block
+        self.falling_block.col = self.ncols // 2
+        self.falling_block.ismoving = True
+
+        # New preview block
+        self.preview_block = self.new_block()
+        return self.falling_block
+
+    #
+    # MATCHES AND CASCADES
+    #
+    # Call chart (GameView adds a flash delay before each delete_jewels):
+    # move_down ->
+    # | -> if iswild: process_wildpiece_drop
+    # |               |-> delete_jewels
+    # |                   |-> process_blocks
+    # |                       |-> delete_jewels (...)
+    # | -> else: process_blocks
+    # |          |-> delete_jewels
+    # |              |-> process_blocks
+    # |                  |-> delete_jewels (...)
+    def add_to_board(self, block):
+        c, r = block.col, block.row
+        for i in range(self.block_size):
+            self.board.set(r+i, c, block.pieces[i])
+            self.dirty.add((r+i, c))
+
+    def print_board(self):
+        for i in range(self.nrows):
+            print(' '.join([str(self.board.get(i, j)) \
+                    for j in range(self.ncols)]))
+        print('-'.join(['-' for j in range(self.ncols)]))
+
+    def find_matches(self, full=False):
+        """Find runs of min_run or more matching jewels in any direction
+
+        Returns the set of (row, col) cells in such runs, and the points
+        for all the runs (before the cascade multiplier).
+
+        In incremental mode only the lines through the dirty cells (those
+        that changed since the last scan) are checked, unless full is set.
+        Any new run must go through one of them, as everything else was
+        there at the last scan and didn't match.
+        """
+        if full or not self.incremental:
+            return self.scan_board()
+
+        result = self.board.scan_cells(self.dirty, self.min_run)
+        if self.verify and result != self.scan_board():
+            self.print_board()
+            raise ValueError('incremental scan error')
+        return result
+
+    def scan_board(self):
+        """Find all the runs of min_run or more on the board"""
+        if self.use_numpy:
+            mask, add_score = matching.find_matches_np(self.board.tolist(),
+                    self.min_run)
+            return matching.match_cells(mask), add_score
+        return self.board.scan(self.min_run)
+
+    def process_blocks(self):
+        """Check the board for adjacent matching jewels.
+
+        Returns the cells to be deleted; the points for them are posted
+        (calc_points), to be added to the score by delete_jewels().
+        An empty result ends the cascade.
+        """
+        self.iteration += 1
+        indices, add_score = self.find_matches()
+        self.dirty = set()
+
+        if indices:
+            # Post the score increase for when the jewels are removed
+            self.calc_points(add_score, self.iteration)
+        else:
+            # Done processing dropped block, game logic can resume
+            self.iteration = 0
+        return indices
+
+    def process_wildpiece_drop(self, block):
+        """Find the cells cleared by a landed wild block
+
+        The wild block's own cells are included, although a wild block is
+        never added to the board.
+        """
+        c, r = block.col, block.row
+        indices = [(r+i, c) for i in range(self.block_size)]
+        if r + self.block_size < self.nrows:
+            # Didn't hit bottom, so must have hit a fallen jewel. What color?
+            match_piece = self.board.get(r+self.block_size, c)
+            indices += self.board.cells_of(match_piece)
+
+        self.calc_points(JEWEL_SCORE, 1)
+        return indices
+
+    def delete_jewels(self, indices, scoring=True):
+        """Remove jewels from the board and let the rest fall
+
+        Returns the result of drop_down_blocks().
+        """
+        if scoring:
+            # Update score and rest
+            self.add_score()
+            self.decr_rest(len(indices))
+
+        holes = {}          # Lowest emptied row of each column
+        for r, c in indices:
+            self.board.set(r, c, 0)
+            if r > holes.get(c, -1):
+                holes[c] = r
+
+        return self.drop_down_blocks(holes)
+
+    def drop_down_blocks(self, holes=None):
+        """Move fallen jewels down after matched jewels are removed
+
+        holes   {col: row} of the lowest emptied cell in each column that
+                changed, or None for the whole board
+
+        Returns the moves, as a list of ((row, col), new_row) with the
+        bottom-most move of each column first, and the sets of columns and
+        rows that changed (see GridBoard.compact()).
+        """
+        moves, cols, rows = self.board.compact(holes)
+        self.dirty.update((nr, c) for (r, c), nr in moves)
+        return moves, cols, rows
+
+    def settle(self):
+        """Resolve a landed block and all its cascades at once
+
+        Returns the depth of the cascade (number of deletions).
+
+        With a cache, what the cascade of a (non-wild) landed block does
+        is kept by the board's hash: the cells it changed, the points, the
+        jewels cleared at each step, its depth and multiplier. When the
+        same board lands again, that is played back instead. The board
+        settled before the block landed, so what happens depends on the
+        board alone.
+        """
+        key = entry = None
+        if self.cache is not None and not self.falling_block.iswild:
+            key = self.board.hash
+            entry = self.cache.get(key)
+            if entry is not None and not self.verify:
+                return self.settle_cached(entry)
+            score = self.score
+
+        depth = 0
+        cleared = []
+        if self.falling_block.iswild:
+            indices = self.process_wildpiece_drop(self.falling_block)
+        else:
+            indices = self.process_blocks()
+        if key is not None and indices:
+            # Only a board that changes needs comparing afterwards
+            before = list(chain.from_iterable(self.board.tolist()))
+
+        while indices:
+            depth += 1
+            cleared.append(len(indices))
+            self.delete_jewels(indices)
+            indices = self.process_blocks()
+
+        self.blocks += 1
+        self.depth = depth
+
+        if key is not None:
+            changes = ()
+            if depth:
+                after = chain.from_iterable(self.board.tolist())
+                changes = tuple((i, piece) for i, (old, piece) \
+                        in enumerate(zip(before, after)) if old != piece)
+            # (A landing that clears nothing leaves mult as it was, so
+            # that's not down to the board)
+            result = (changes, self.score - score, tuple(cleared), depth,
+                    self.mult if depth else None)
+            if entry is not None and entry != result:
+                self.print_board()
+                raise ValueError('settle cache error')
+            self.cache.put(key, result)
+        return depth
+
+    def settle_cached(self, entry):
+        """Play back a cascade kept by settle()"""
+        changes, points, cleared, depth, mult = entry
+        for i, piece in changes:
+            r, c = divmod(i, self.ncols)
+            self.board.set(r, c, piece)
+        self.dirty = set()
+
+        if depth:
+            # As left by the last add_score()
+            self.score += points
+            self.points = 0
+            self.showpoints = self.showmult = False
+            self.mult = mult
+            for n in cleared:
+                self.decr_rest(n)
+        self.iteration = 0
+
+        self.blocks += 1
+        self.depth = depth
+        return depth
+
+    #
+    # STEP API
+    #
+    def apply(self, action):
+        """Apply a single input to the falling block"""
+        if action == LEFT:
+            self.move_left()
+        elif action == RIGHT:
+            self.move_right()
+        elif action == ROTATE:
+            self.rotate()
+        elif action == DROP:
+            if self.drop() is not None:
+                self.settle()
+        elif action == EXIT:
+            # The block stops where it is: nothing moves or lands after
+            self.falling_block.ismoving = False
+            self.game_over = True
+
+    def advance(self):
+        """Advance the falling block one beat of the game timer
+
+        Returns MOVED, LANDED, TOPPED_OUT or SPAWNED. Resolving a landed
+        block and losing a life are left to the caller.
+        """
+        self.ticks += 1
+        if self.falling_block.ismoving:
+            # If a block is already on the board,  move it down
+            return LANDED if self.move_down() else MOVED
+        elif self.topped_out():
+            # Can a new block be introduced? ..No
+            return TOPPED_OUT
+        else:
+            # ..Yes
+            self.spawn()
+            return SPAWNED
+
+    def tick(self):
+        """Advance the game one step, resolving everything at once"""
+        if self.game_over: return
+
+        event = self.advance()
+        if event == LANDED:
+            self.settle()
+        elif event == TOPPED_OUT:
+            self.lose_life()
+
+    def step(self, action=NOOP):
+        """Apply an input and advance one tick
+
+        Returns the points scored during the step.
+        """
+        score = self.score
+        self.apply(action)
+        self.tick()
+        return self.score - score
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
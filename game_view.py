@@ -11,159 +11,153 @@ License:        GPL (See LICENSE file for details)
 
 """
 
+import sys
 import arcade
-from random import randrange, choice
-from itertools import groupby
-from functools import partial
+from random import Random, getrandbits
 
 from common import Timer
+from scheduler import scheduler
 
 from common import SCREEN_WIDTH, SCREEN_HEIGHT
 from common import BOARD_W, BOARD_H, BOARD_X, BOARD_Y
 from common import PREVIEW_W, PREVIEW_H, PREVIEW_X, PREVIEW_Y
 from common import SCORE_X, SCORE_Y, SCORE_W, SCORE_RX, SCORE_CH
 from common import LOGO_W, LOGO_H, LOGO_CX, LOGO_CY
-from common import NCOLS, NROWS, PIECE_SIZE
-from common import VERSION_STR, VERSION_X, VERSION_Y
-from common import BLOCK_SIZE, NUM_PIECES, WILD_PIECE
-from common import PIECES_PER_STAGE, AVG_BLOCKS_BETWEEN_JEWELS
-from common import NUM_BACKGND, NUM_FLASH
-from common import FLASH_TIMER, FLASH_DELAY
-from common import JEWEL_SCORE, DROP_POINTS, INITIAL_LIVES, MAX_STAGE
+from common import PIECE_SIZE
+from common import NUM_PIECES, NUM_BACKGND
+from common import FLASH_TIMER, FLASH_DELAY, SPEEDS
 
-from sprites import BackgroundSprite, Jewel, JewelBlock, JewelList
+from engine import Engine, MOVED, LANDED, TOPPED_OUT
+from engine import LEFT, RIGHT, ROTATE, DROP, EXIT
+from replay import Replay
+from verify import verify
+import assets
+from sprites import BackgroundSprite, JewelPool, JewelBlock, JewelList
+from text import TextLayer
+from profiler import profiler, timed, Overlay
+
+REPLAY_FILE = 'resources/text/pyjewel.replay'
+TRACE_FILE = 'pyjewel-trace.json'
+
+MOVE_DOWN_SOUND = ':resources:/sounds/jump4.wav'
+DROP_SOUND = ':resources:/sounds/jump2.wav'
+HIT_SOUND = ':resources:/sounds/hit4.wav'
+FLASH_SOUND = ':resources:/sounds/rockHit2.ogg'
+LOSE_SOUND = ':resources:/sounds/lose1.wav'
 
 
 class GameView(arcade.View):
-    """View for the actual game"""
+    """View for the actual game
+
+    The rules are in engine.Engine; this view drives the engine from its
+    timers, and shows (and animates) the result. Every game gets a fresh
+    seed, and the inputs the engine takes are recorded, so that the last
+    game is saved as a replay.Replay in REPLAY_FILE.
+    """
 
     def __init__(self):
         super().__init__()
-        self.speeds = [ 1.500, 1.250, 1.000, 0.750, 0.500, 0.250, 0.2375,
-                0.2250, 0.2125, 0.2000, 0.1875, 0.1750, 0.1625, 0.1500,
-                0.1375, 0.1250, 0.1125, 0.1000, 0.0875, 0.0750, 0.0625,
-                0.0500, 0.0375, 0.0250, 0.0125, 0.0000, 0.0000]
-        #self.speed is the game tick (seconds)
-
         # Create timers - one for special effects, one for the game progress
         self.fx_timer = Timer(FLASH_TIMER/1000, self.advance_fx)
-        self.game_timer = Timer(self.speeds[0], self.advance_game)
+        self.game_timer = Timer(SPEEDS[0], self.advance_game)
 
+        self.engine = Engine()
+        self.pending = []       # scheduler.Handle of each delayed call
+        self.setup()
         self.new_game()
 
     #
     # GAME SETUP
     #
     def setup(self):
-        # Load textures
-        self.logo = arcade.load_texture('resources/images/jewellogo.png',
-                can_cache=True)
-        self.logo2 = arcade.load_texture('resources/images/jewellogo2.png',
-                can_cache=True)
-        self.jtextures = [arcade.load_texture('resources/images/jewel.png',
-                can_cache=True)]
-        for i in range(1, NUM_PIECES + 1):
-            self.jtextures.append(arcade.load_texture(
-                    'resources/images/piece' + str(i) + '.png', can_cache=True))
-        self.ftextures = []
-        for i in range(1, NUM_FLASH + 1):
-            self.ftextures.append(arcade.load_texture(
-                    'resources/images/flash' + str(i) + '.png', can_cache=True))
-        self.ftextures.append(arcade.load_texture('resources/images/trans.png',
-                can_cache=True))
-
-        # Load sounds
-        self.move_down_sound = arcade.load_sound(':resources:/sounds/jump4.wav')
-        self.drop_sound = arcade.load_sound(':resources:/sounds/jump2.wav')
-        self.hit_sound = arcade.load_sound(':resources:/sounds/hit4.wav')
-        self.flash_sound = arcade.load_sound(':resources:/sounds/rockHit2.ogg')
-        self.lose_sound = arcade.load_sound(':resources:/sounds/lose1.wav')
-
-        # Board border
-        self.border = arcade.SpriteList(use_spatial_hash=True, is_static=True)
-        for i in range(BOARD_H):
-            b = arcade.Sprite('resources/images/border.png')
-            b.left = BOARD_X
-            b.top = SCREEN_HEIGHT - (BOARD_Y + PIECE_SIZE*i)
-            self.border.append(b)
-
-            b = arcade.Sprite('resources/images/border.png')
-            b.left = BOARD_X + PIECE_SIZE*(BOARD_W-1)
-            b.top = SCREEN_HEIGHT - (BOARD_Y + PIECE_SIZE*i)
-            self.border.append(b)
-
-        for i in range(BOARD_W):
-            b = arcade.Sprite('resources/images/border.png')
-            b.left = BOARD_X + PIECE_SIZE*i
-            b.top = SCREEN_HEIGHT - (BOARD_Y + PIECE_SIZE*(BOARD_H-1))
-            self.border.append(b)
+        """Build what stays the same from one game to the next"""
+        # Textures
+        self.logo = assets.texture('jewellogo.png')
+        self.logo2 = assets.texture('jewellogo2.png')
+        self.jtextures = assets.jewel_textures()
+        self.ftextures = assets.flash_textures()
+
+        # Board border, preview border and board background, as one sprite
+        # each and drawn together
+        self.backdrop = arcade.SpriteList()
+        tiles = [(0, j) for j in range(BOARD_H)] + \
+                [(BOARD_W-1, j) for j in range(BOARD_H)] + \
+                [(i, BOARD_H-1) for i in range(1, BOARD_W-1)]
+        b = arcade.Sprite(texture=assets.tiled_texture('border.png', tiles))
+        b.left = BOARD_X
+        b.top = SCREEN_HEIGHT - BOARD_Y
+        self.backdrop.append(b)
 
         # Preview border
-        for i in range(PREVIEW_W):
-            for j in range(PREVIEW_H):
-                if i == 1 and j != 0 and j != PREVIEW_H - 1: continue
-                #and (j != 0 or j != PREVIEW_H -1): continue
-                b = arcade.Sprite('resources/images/border.png')
-                b.left = PREVIEW_X + PIECE_SIZE*i
-                b.top = SCREEN_HEIGHT - (PREVIEW_Y + PIECE_SIZE*j)
-                self.border.append(b)
+        tiles = [(i, j) for i in range(PREVIEW_W) for j in range(PREVIEW_H) \
+                if i != 1 or j == 0 or j == PREVIEW_H - 1]
+        b = arcade.Sprite(texture=assets.tiled_texture('border.png', tiles))
+        b.left = PREVIEW_X
+        b.top = SCREEN_HEIGHT - PREVIEW_Y
+        self.backdrop.append(b)
 
         # Board background
-        self.background = arcade.SpriteList(is_static=False)
-        for i in range(NCOLS):
-            for j in range(NROWS):
-                b = BackgroundSprite('resources/images/back%d.png',
-                        1, NUM_BACKGND)
-                b.left = BOARD_X + PIECE_SIZE*(i+1)
-                b.top = SCREEN_HEIGHT - (BOARD_Y + PIECE_SIZE*j)
-                self.background.append(b)
-
-        # Preview block of jewels
-        self.preview_block = JewelBlock(self.jtextures, self.ftextures)
-
-        # Falling block of jewels
-        self.falling_block = self.preview_block
-
-        # Fallen jewels
-        self.fallen_jewels = JewelList(use_spatial_hash=True)
-
-        # Jewels that need to flash
-        self.flashing_jewels = JewelList(use_spatial_hash=True)
+        self.background = BackgroundSprite('back%d.png', 1, NUM_BACKGND)
+        self.background.left = BOARD_X + PIECE_SIZE
+        self.background.top = SCREEN_HEIGHT - BOARD_Y
+        self.backdrop.append(self.background)
+
+        # Jewels, recycled from one block (and game) to the next, as are the
+        # sprite lists holding them
+        self.pool = JewelPool(self.jtextures, self.ftextures)
+        self.fallen_jewels = JewelList()        # Fallen jewels
+        self.flashing_jewels = JewelList()      # Jewels that need to flash
+        # The preview and the falling block take turns with these two
+        self.blocks = (JewelBlock(self.pool), JewelBlock(self.pool))
+
+        # Scoreboard, as a label and a value on each line, and help string
+        self.text = TextLayer()
+        self.score_labels = []
+        for i, label in enumerate(['POINTS', 'X', 'SCORE', 'LIVES', 'SPEED',
+                'STAGE', 'REST', 'SOUND', '']):
+            y = SCORE_Y - SCORE_CH*i
+            self.score_labels.append((
+                    self.text.add(label, SCORE_X, y, font_name='fixed',
+                        font_size=18, bold=True, anchor_x='left'),
+                    self.text.add('', SCORE_RX, y, font_name='fixed',
+                        font_size=18, bold=True, anchor_x='right')))
+        self.text.add_version()
+
+        # Profiler numbers, over the board
+        self.overlay = Overlay(BOARD_X + PIECE_SIZE + 4,
+                SCREEN_HEIGHT - BOARD_Y - 16, lambda: [
+                    ('fallen jewels', len(self.fallen_jewels)),
+                    ('flashing jewels', len(self.flashing_jewels)),
+                    ('cascade depth', self.engine.iteration),
+                    ('jewels made', self.pool.created),
+                    ('pool hit rate', '{:.1%}'.format(self.pool.hit_rate))])
 
     #
     # GAME LOGIC
     #
-    def new_board(self):
-        # Create the main board of 0's
-        board = [[0 for i in range(NCOLS)] for j in range(NROWS)]
-        return board
-
     def new_game(self):
-        self.setup()
-        self.points = 0
-        self.showpoints = False
-        self.mult = 1
-        self.showmult = False
-        self.score = 0
-        self.score_incr = 0
-        self.iteration = 0
-        self.lives = INITIAL_LIVES
-        self.stage = 1
-        self.speed = self.speeds[self.stage]
-        self.rest = PIECES_PER_STAGE
+        self.cancel_pending()
+        self.background.reset()
+        self.release_jewels()
+
+        self.engine.new_game(getrandbits(64))
+        self.replay = Replay.for_engine(self.engine)
+        # For the fill effect, which mustn't take from the engine's RNG
+        self.rng = Random(~self.engine.seed)
         self.paused = False
         self.sound = False
-        self.game_over = False
         self.fx_fill = False
-        self.board = self.new_board()
+
+        # Preview block of jewels (no falling block yet)
+        self.preview_block, self.falling_block = self.blocks
+        self.preview_block.set_block(self.engine.preview_block)
 
         # Reset and stop fx timer
         self.fx_timer.reset()
         self.fx_timer.stop()
 
-        # Reset and start game timer
-        self.game_timer.duration = self.speed
-        self.game_timer.start()
+        # Reset game timer (started by on_show)
+        self.game_timer.duration = self.engine.speed
 
     def toggle_pause(self):
         self.paused = not self.paused
@@ -172,109 +166,123 @@ class GameView(arcade.View):
         else:
             self.game_timer.start()
 
-    def incr_stage(self):
-        self.stage = 1 + (self.stage % MAX_STAGE)
-        self.background.update()
-        self.speed = self.speeds[self.stage]
+    def update_stage(self, stage):
+        """Catch up with a stage change in the engine"""
+        if self.engine.stage != stage:
+            self.background.update()
 
-        # Update timer with new speed
-        self.game_timer.duration = self.speed
+            # Update timer with new speed
+            self.game_timer.duration = self.engine.speed
 
-    def decr_rest(self, val):
-        self.rest -= val
-        if self.rest <= 0:
-            self.rest += PIECES_PER_STAGE
-            self.incr_stage()
-
-    def decr_lives(self):
+    def lose_life(self):
         #if self.sound:
-        #    arcade.play_sound(self.lose_sound)
-        self.lives -= 1
-        if not self.lives: 
-            self.game_over = True
+        #    arcade.play_sound(assets.sound(LOSE_SOUND))
+        self.engine.lose_life()
+        if self.engine.game_over:
             self.game_timer.stop()
             # This call isn't needed. process_blocks() will call end_game()
             #arcade.schedule(self.end_game, 2*FLASH_DELAY)
 
-    def end_game(self, delta_time: float):
+    def end_game(self):
         """End game"""
-        arcade.unschedule(self.end_game)
+        self.cancel_pending()
+
+        self.replay.finish(self.engine)
+        self.replay.save(REPLAY_FILE)
+
+        # Only a score that replays is a high score
+        result = verify(self.replay, REPLAY_FILE)
+        if not result.ok:
+            print('Replay ended on stage {}, score {}'.format(result.stage,
+                    result.score), file=sys.stderr)
 
         #  Switch to highscore view, and update high scores
         self.window.show_view(self.window.hscore_view)
-        self.window.hscore_view.update_high_scores(self.stage, self.score)
+        self.window.hscore_view.update_high_scores(result.stage,
+                result.score)
+
+    def record(self, action):
+        """Record an input the engine took"""
+        self.replay.record(self.engine.ticks, action)
 
     def exit_game(self):
-        self.game_over = True
+        self.record(EXIT)
+        self.engine.apply(EXIT)
         self.game_timer.stop()
 
         self.fx_fill = True
         self.fx_timer.start()
 
         self.falling_block = self.preview_block
-        arcade.schedule(self.end_game, 3*FLASH_DELAY) # enough delay for fx
+        self.schedule(3*FLASH_DELAY, self.end_game) # enough delay for fx
 
     def on_show(self):
         """This is run once when we switch to this view"""
         self.new_game()
+        self.game_timer.start()
+
+    def on_hide_view(self):
+        # Nothing of this game may run once it's off screen
+        self.game_timer.stop()
+        self.fx_timer.stop()
+        self.cancel_pending()
+
+    def schedule(self, delay, callback, *args):
+        """Call callback(*args) after delay seconds, unless cancelled"""
+        self.pending = [h for h in self.pending if h.active]
+        self.pending.append(scheduler.call_later(delay, callback, *args))
+
+    def cancel_pending(self):
+        """Cancel all the calls made with schedule()"""
+        for h in self.pending:
+            h.cancel()
+        self.pending = []
 
     def rotate(self):
-        if not self.falling_block.ismoving: return
-        self.falling_block.rotate()
+        if self.engine.rotate():
+            self.record(ROTATE)
+            self.falling_block.rotate()
 
     def move_left(self):
-        if not self.falling_block.ismoving: return
-        fc, fr = self.falling_block[-1].col, self.falling_block[-1].row
-        if fc > 0 and self.board[fr][fc-1] == 0:
+        if self.engine.move_left():
+            self.record(LEFT)
             self.falling_block.move_left()
 
     def move_right(self):
-        if not self.falling_block.ismoving: return
-        fc, fr = self.falling_block[-1].col, self.falling_block[-1].row
-        if fc < NCOLS-1 and self.board[fr][fc+1] == 0:
+        if self.engine.move_right():
+            self.record(RIGHT)
             self.falling_block.move_right()
 
     def drop(self):
-        if not self.falling_block.ismoving: return
         #if self.sound:
-        #    arcade.play_sound(self.drop_sound)
-
-        cycles = -1
-        while self.falling_block.ismoving:
-            cycles += 1
-            self.move_down(quiet=True)
-
-        if cycles > 0:
-            self.score += DROP_POINTS*cycles
-
-    def move_down(self, quiet=False):
-        # Have we hit bottom, or one of the fallen jewels
-        fc, fr = self.falling_block[-1].col, self.falling_block[-1].row
-        if (self.falling_block.row + BLOCK_SIZE == NROWS) or \
-                self.board[fr+1][fc] != 0:
-            #if self.sound and not quiet:
-            #    arcade.play_sound(self.hit_sound)
-            self.falling_block.ismoving = False # Disable response to keys
-
-            # Enable effects, pause game
-            self.game_timer.stop()
-            self.fx_timer.start()
+        #    arcade.play_sound(assets.sound(DROP_SOUND))
+        cycles = self.engine.drop()
+        if cycles is None: return
+        self.record(DROP)
 
-            # Add to fallen blocks
-            self.fallen_jewels.extend(self.falling_block)
-            if self.falling_block.iswild:
-                # Process the block hit by the wildpiece
-                self.process_wildpiece_drop(self.falling_block)
-            else:
-                # Update board
-                self.add_to_board(self.falling_block)
-                # Process the fallen block
-                self.process_blocks()
+        self.falling_block.move_down(cycles)
+        self.land(quiet=True)
+
+    def land(self, quiet=False):
+        """The falling block has hit bottom, or one of the fallen jewels"""
+        #if self.sound and not quiet:
+        #    arcade.play_sound(assets.sound(HIT_SOUND))
+
+        # Enable effects, pause game
+        self.game_timer.stop()
+        self.fx_timer.start()
+
+        # Add to fallen blocks
+        self.fallen_jewels.extend(self.falling_block)
+        if self.falling_block.iswild:
+            # Process the block hit by the wildpiece
+            self.process_wildpiece_drop(self.falling_block)
         else:
-            self.falling_block.move_down()
+            # Process the fallen block (already added to the board)
+            self.process_blocks()
 
     # Call chart:
-    # move_down ->
+    # land ->
     # | -> if iswild: process_wildpiece_drop
     # |               |-> [schedule] delete_jewels
     # |                              |-> process_blocks
@@ -284,81 +292,60 @@ class GameView(arcade.View):
     # |                         |-> process_blocks
     # |                             |-> [schedule] delete_jewels (...)
 
-    def add_to_board(self, block):
-        c, r = block.col, block.row
-        for i in range(BLOCK_SIZE):
-            self.board[r+i][c] = block.pieces[i]
+    def release_jewels(self):
+        """Return every jewel shown to the pool"""
+        jewels = set()
+        for sl in (self.fallen_jewels, self.flashing_jewels) + self.blocks:
+            jewels.update(sl.sprite_list)
+        for s in jewels:
+            self.pool.release(s)
 
     def print_board(self):
         self.fallen_jewels.print()
-        for i in range(NROWS):
-            print(' '.join([str(self.board[i][j]) for j in range(NCOLS)]))
-        print('-'.join(['-' for j in range(NCOLS)]))
+        self.engine.print_board()
 
     def fill_effect(self):
-        empty_cells = [(r, c) for r in range(NROWS) for c in range(NCOLS) \
-                if not self.board[r][c]]
+        board = self.engine.board
+        empty_cells = [(r, c) for r in range(self.engine.nrows) \
+                for c in range(self.engine.ncols) if board.is_empty(r, c)]
 
         # Fill an empty cell with a random jewel
         if len(empty_cells):
-            r, c = choice(empty_cells)
-            j = randrange(NUM_PIECES)+1
-            self.fallen_jewels.append(
-                    Jewel(self.jtextures[j], self.ftextures, j, r, c))
-            self.board[r][c] = j
+            r, c = self.rng.choice(empty_cells)
+            j = self.rng.randrange(NUM_PIECES)+1
+            self.fallen_jewels.append(self.pool.acquire(j, r, c))
+            board.set(r, c, j)
         else:
             # If done adding random jewels, 
             # disable fill effect, (enable animation - shrink)
             self.fx_fill = False
             for s in self.fallen_jewels.sprite_list:
                 s.animation = 'shrink'
-            self.board = self.new_board()
             self.flashing_jewels.extend(self.fallen_jewels)
-            self.decr_lives()
-            self.scheduled_function = partial(self.delete_jewels, False)
-            arcade.schedule(self.scheduled_function, FLASH_DELAY)
+            self.lose_life()
+            self.schedule(FLASH_DELAY, self.delete_jewels, False)
 
-    def process_wildpiece_drop(self, block):
-        self.flashing_jewels.extend(block)
-
-        c, r = block.col, block.row
-        if r + 3 < NROWS:
-            # Didn't hit bottom, so must have hit a fallen jewel. What color?
-            match_piece = self.board[r+3][c]
-            indices = [(i, j) for i in range(NROWS) \
-                    for j in range(NCOLS) if self.board[i][j] == match_piece]
-            match_jewels = [self.fallen_jewels.find(i[0], i[1]) \
-                    for i in indices]
-            self.flashing_jewels.extend(match_jewels)
+    def flash(self, indices):
+        """Set the jewels at the given cells flashing"""
+        match_jewels = [self.fallen_jewels.find(i[0], i[1]) \
+                for i in indices]
+        self.flashing_jewels.extend(match_jewels)
 
-        self.calc_points(JEWEL_SCORE, 1)
+    def process_wildpiece_drop(self, block):
+        self.flash(self.engine.process_wildpiece_drop(block.block))
 
         # Give jewels time to flash, and schedule deletion/further processing
-        self.scheduled_function = partial(self.delete_jewels, True)
-        arcade.schedule(self.scheduled_function, FLASH_DELAY)
-
-    def drop_down_blocks(self):
-        """Move fallen jewels down after flashing jewels are removed"""
-        for r in range(NROWS-2, -1, -1):
-            for c in range(NCOLS):
-                if self.board[r][c]:
-                    s = self.fallen_jewels.find(r, c)
-                    assert s is not None
-                    for nr in range(r+1, NROWS):
-                        if not self.board[nr][c]:
-                            s.center_y += -PIECE_SIZE
-                            s.row += 1
-                            self.board[nr][c] = self.board[nr-1][c]
-                            self.board[nr-1][c] = 0
+        self.schedule(FLASH_DELAY, self.delete_jewels, True)
 
     def verify_match_pieces(self, indices):
         if not len(indices): return
         print('verify_match_pieces {}'.format(indices))
+        board = self.engine.board
         i0 = indices[0]
-        first_piece = self.board[i0[0]][i0[1]]
+        first_piece = board.get(i0[0], i0[1])
         error = 0
         for i in indices[1:]:
-            if self.board[i[0]][i[1]] != first_piece:
+            if board.get(i[0], i[1]) != first_piece:
                 error = 1
                 break
 
@@ -366,133 +353,53 @@ class GameView(arcade.View):
             self.print_board()
             print('ERROR: Found match pieces to be', end=' ')
             for i in indices:
-                print(self.board[i[0]][i[1]], end=' ')
+                print(board.get(i[0], i[1]), end=' ')
             raise ValueError('verify error')
 
-    def calc_points(self, points, mult):
-        self.points = points * (1 << (mult-1))
-        self.mult = mult
-        self.showpoints = True
-        self.showmult = True
-
-    def add_score(self):
-        self.score += self.points
-        self.showpoints = False
-        self.showmult = False
-        self.points = 0
-
+    @timed('process_blocks')
     def process_blocks(self):
-        """Check the board for adjacent matching jewels."""
-        # https://stackoverflow.com/questions/44790869/
-        # find-indexes-of-repeated-elements-in-an-array-python-numpy
-        # /44792205#44792205
-        def find_consecutive_ranges(lst, n=3):
-            # Elements of the input list are of the form (v, k)
-            # Return a list of list of k's of >=n runs of the same 'v'
-
-            # Identify consecutive groups of same value (value != 0)
-            groups = [list(g) for k, g in groupby(lst, lambda x: x[0]) if k]
-            # Pick only groups of length >= 3
-            len3reps = [g for g in groups if len(g) >= n]
-            # Extract list of list of k's
-            return [[x[1] for x in len3rep] for len3rep in len3reps]
-
-        def points(n):
-            return 300 + (n-3)*150
-
-        add_score = 0
-        self.iteration += 1
-        indices = set()     # Needs to be set to avoid duplicates
-
-        # Check consecutive matching blocks horizontally
-        for r in range(NROWS):
-            # For this row, create ordered list of (value, cell)
-            L = [(self.board[r][c], (r, c)) for c in range(NCOLS)]
-            for cell_range in find_consecutive_ranges(L):
-                add_score += points(len(cell_range))
-                indices.update(cell_range)
-
-        # Check consecutive matching blocks vertically
-        for c in range(NCOLS):
-            # For this row, create ordered list of (value, cell)
-            L = [(self.board[r][c], (r, c)) for r in range(NROWS)]
-            for cell_range in find_consecutive_ranges(L):
-                add_score += points(len(cell_range))
-                indices.update(cell_range)
-
-        # Check consecutive matching blocks diagonally right
-        # https://www.geeksforgeeks.org/zigzag-or-diagonal-traversal-of-matrix/
-        for line in range(3, NROWS+NCOLS-2):
-            # Get column index of first element in this line
-            # index is 0 for line 0, and (line - ROW) for a given line
-            start_col = max(0, line - NROWS)
-            count = min(line, (NCOLS - start_col), NROWS)
-            L = [(self.board[min(NROWS, line) - j - 1][start_col+j], 
-                    (min(NROWS, line) - j - 1, start_col+j)) \
-                    for j in range(count)]
-            for cell_range in find_consecutive_ranges(L):
-                add_score += points(len(cell_range))
-                indices.update(cell_range)
-
-        # Check consecutive matching blocks diagonally left
-        for line in range(3, NROWS+NCOLS-2):
-            # Get column index of first element in this line
-            # index is 0 for line 0, and (line - ROW) for a given line
-            start_col = max(0, line - NROWS)
-            count = min(line, (NCOLS - start_col), NROWS)
-            L = [(self.board[min(NROWS, line) - j - 1][NCOLS-start_col-j-1], 
-                    (min(NROWS, line) - j - 1, NCOLS-start_col-j-1)) \
-                    for j in range(count)]
-            for cell_range in find_consecutive_ranges(L):
-                add_score += points(len(cell_range))
-                indices.update(cell_range)
-
-        match_jewels = [self.fallen_jewels.find(i[0], i[1]) \
-                for i in indices]
+        """Flash the matching jewels found by the engine"""
         assert not self.flashing_jewels  # Must be empty at this point
-        self.flashing_jewels.extend(match_jewels)
+        self.flash(self.engine.process_blocks())
 
         # Schedule deletion
         # (with a further mutual recursive call into this function)
         # only if there's something to delete
         if len(self.flashing_jewels):
             #if self.sound:
-            #    arcade.play_sound(self.lose_sound)
-            # Post the score increase for when the jewels are removed
-            self.calc_points(add_score, self.iteration)
-
-            self.scheduled_function = partial(self.delete_jewels, True)
-            arcade.schedule(self.scheduled_function, FLASH_DELAY)
+            #    arcade.play_sound(assets.sound(LOSE_SOUND))
+            self.schedule(FLASH_DELAY, self.delete_jewels, True)
         else:
-            # Done processing dropped block, game logic can resume
-            self.iteration = 0
+            # Done processing dropped block
             # Disable effects, resume game logic
             self.fx_timer.stop()
-            if self.game_over:
-                self.end_game(0)
+            if self.engine.game_over:
+                self.end_game()
             elif not self.paused: 
                 self.game_timer.start()
 
-    def delete_jewels(self, scoring, delta_time: float):
-        # Unschedule future recurrences of this scheduled call
-        arcade.unschedule(self.scheduled_function)
-
+    @timed('delete_jewels')
+    def delete_jewels(self, scoring):
         # Remove jewels (note: can't iterate over sprite_list directly)
         jewels_to_delete = [s for s in self.flashing_jewels.sprite_list]
-        
-        if scoring:
-            # Update score and rest
-            self.add_score()
-            self.decr_rest(len(jewels_to_delete))
+
+        stage = self.engine.stage
+        moves, _, _ = self.engine.delete_jewels(
+                [(s.row, s.col) for s in jewels_to_delete], scoring)
+        self.update_stage(stage)
 
         for s in jewels_to_delete:
-            self.board[s.row][s.col] = 0
-            s.kill()
+            self.pool.release(s)
+
+        # Move the sprites of the jewels that fell
+        for (r, c), nr in moves:
+            s = self.fallen_jewels.find(r, c)
+            self.fallen_jewels.move_jewel(s, nr, c)
 
-        self.drop_down_blocks()
         # Continue processing fallen blocks
         self.process_blocks()
 
+    @timed('advance_fx')
     def advance_fx(self, delta_time):
         """
         Initiate special effects.
@@ -509,85 +416,85 @@ class GameView(arcade.View):
             # Animation effect (flash/shrink)
             self.flashing_jewels.update_animation(delta_time)
 
+    @timed('advance_game')
     def advance_game(self, _delta_time):
         """
         Advance the game one step.
 
         :param float delta_time: Unused
         """
-        if self.falling_block.ismoving:
-            # If a block is already on the board,  move it down
-            self.move_down()
-        elif self.board[BLOCK_SIZE-1][NCOLS//2]:
-            # Can a new block be introduced?
-            # ..No: trigger fill effect
+        event = self.engine.advance()
+        if event == MOVED:
+            # A block is already on the board, it moved down
+            self.falling_block.move_down()
+        elif event == LANDED:
+            self.land()
+        elif event == TOPPED_OUT:
+            # No room for a new block: trigger fill effect
             self.fx_fill = True
             self.game_timer.stop()
             self.fx_timer.start()
         else:
-            # ..Yes: move preview block to board as a falling block
-            self.falling_block = self.preview_block
+            # Preview block moved to board as a falling block
+            self.falling_block, self.preview_block = \
+                    self.preview_block, self.falling_block
             self.falling_block.move_to_board()
             #if self.sound:
-            #    arcade.play_sound(self.move_down_sound)
+            #    arcade.play_sound(assets.sound(MOVE_DOWN_SOUND))
 
-            # New preview block
-            self.preview_block = JewelBlock(self.jtextures, self.ftextures)
+            # New preview block, in the list the last falling block was in
+            self.preview_block.set_block(self.engine.preview_block)
 
+    @timed('on_update')
     def on_update(self, delta_time: float):
-        self.fx_timer.update(delta_time)
-        self.game_timer.update(delta_time)
+        profiler.frame()
+        scheduler.update(delta_time)
 
     #
     # DRAW ROUTINES
     #
     def draw_scoreboard(self):
         # Score and other status items
-        flags = [self.showpoints, self.showmult, True, True, True, True,
-                True, True, self.paused or self.game_over]
-        labels = ['POINTS', 'X', 'SCORE', 'LIVES', 'SPEED', 'STAGE',
-                'REST', 'SOUND', '']
-        values = [self.points, self.mult, self.score, self.lives,
-                '{:.4f}'.format(self.speed), self.stage,
-                self.rest, 'ON' if self.sound else 'OFF',
+        # (only the values that changed are laid out again)
+        e = self.engine
+        flags = [e.showpoints, e.showmult, True, True, True, True,
+                True, True, self.paused or e.game_over]
+        values = [e.points, e.mult, e.score, e.lives,
+                '{:.4f}'.format(e.speed), e.stage,
+                e.rest, 'ON' if self.sound else 'OFF',
                 'PAUSED' if self.paused else 'GAME OVER']
 
-        for i, item in enumerate(zip(flags, labels, values)):
-            flag, label, value = item
-            if flag:
-                arcade.draw_text(label, SCORE_X, SCORE_Y - SCORE_CH*i,
-                        color=arcade.color.WHITE,
-                        font_name='fixed', font_size=18, bold=True,
-                        anchor_x='left')
-                arcade.draw_text(str(value), SCORE_RX, SCORE_Y - SCORE_CH*i,
-                        color=arcade.color.WHITE,
-                        font_name='fixed', font_size=18, bold=True,
-                        anchor_x='right')
+        for (label, value_label), flag, value in zip(self.score_labels,
+                flags, values):
+            label.visible = value_label.visible = flag
+            value_label.text = value
 
         # Logo
         arcade.draw_texture_rectangle(LOGO_CX, LOGO_CY,
                 LOGO_W, LOGO_H, self.logo)
         arcade.draw_texture_rectangle(LOGO_CX, LOGO_CY,
                 LOGO_W, LOGO_H, self.logo2)
-        # Help string
-        arcade.draw_text(VERSION_STR, VERSION_X, VERSION_Y, arcade.color.WHITE,
-                font_size=16, font_name='calibri', bold=True, italic=True,
-                anchor_x='left', anchor_y='top')
+        # Scoreboard and help string
+        self.text.draw()
 
+    @timed('on_draw')
     def on_draw(self):
         """Draw this view"""
         arcade.start_render()
-        self.border.draw()
-        self.background.draw()
+        self.backdrop.draw()
         self.draw_scoreboard()
         self.preview_block.draw()
         self.falling_block.draw()
         self.fallen_jewels.draw()
         self.flashing_jewels.draw()
+        if profiler.enabled:
+            self.overlay.draw()
 
     def on_key_press(self, key, modifiers):
         """Handle user keyboard input
         Q: Quit the game
+        F: Show/hide the profiler overlay
+        T: Save the profiler trace to TRACE_FILE
 
         Arguments:
                 key {int} == which key was pressed
@@ -611,6 +518,13 @@ class GameView(arcade.View):
         elif key == arcade.key.S:
             # Toggle sound
             self.sound = not self.sound
+        elif key == arcade.key.F:
+            # Toggle profiler (and its overlay)
+            profiler.toggle()
+        elif key == arcade.key.T:
+            # Save profiler trace
+            n = profiler.save_trace(TRACE_FILE)
+            print('Saved {} events to {}'.format(n, TRACE_FILE))
         elif key == arcade.key.Q or key == arcade.key.X:
             # Quit
             arcade.close_window()
@@ -14,11 +14,12 @@ License:        GPL (See LICENSE file for details)
 import arcade
 
 from common import Timer
+from scheduler import scheduler
 
 from common import SCREEN_WIDTH, SCREEN_HEIGHT
 from common import START_STR, START_X, START_Y
-from common import VERSION_STR, VERSION_X, VERSION_Y
 from common import key_handler
+from text import TextLayer
 
 SYMBOL_FONT = '-adobe-symbol-*-*-*-*-18-*-*-*-*-*-adobe-*'
 HEADER_FONT = '-*-*-bold-r-*-*-24-*-*-*-p-*-iso8859-1'
@@ -45,6 +46,32 @@ class HelpView(arcade.View):
         super().__init__()
         self.init_vars()
 
+        # All of the text is static, so lay it out just once
+        self.text = TextLayer()
+        self.text.add(HEADER_STR, HEADER_CX, HEADER_CY, font_size=24,
+                anchor_x='center', anchor_y='center')
+
+        y = HEADER_CY
+        separation = 60
+
+        for help_item in HELP_STRS:
+            arrow, key, ops = help_item
+            y -= separation
+
+            # Show help text for operations
+            if arrow:
+                self.text.add(arrow, HELP_LEFT_X, y,
+                        font_size=18,# font_name='symbol',
+                        anchor_x='left', anchor_y='top')
+            self.text.add(key, HELP_LEFT_X+20, y, font_size=18,
+                    anchor_x='left', anchor_y='top')
+            self.text.add(ops, HELP_RIGHT_X, y, font_size=18,
+                    anchor_x='right', anchor_y='top')
+
+        self.text.add(START_STR, START_X, START_Y, font_size=18,
+                anchor_x='center', anchor_y='center')
+        self.text.add_version()
+
     def init_vars(self):
         self.timeout = 10.0     # seconds
         self.interval = 0.0     # Time interval in seconds
@@ -60,44 +87,16 @@ class HelpView(arcade.View):
         self.timer.stop()
         self.window.show_view(self.window.intro_view)
 
+    def on_hide_view(self):
+        self.timer.stop()
+
     def on_update(self, delta_time: float):
-        self.timer.update(delta_time)
+        scheduler.update(delta_time)
 
     def on_draw(self):
         """Draw help view"""
         arcade.start_render()
-
-        arcade.draw_text(HEADER_STR,
-                HEADER_CX, HEADER_CY, arcade.color.WHITE, font_size=24,
-                anchor_x='center', anchor_y='center')
-
-        y = HEADER_CY
-        separation = 60
-
-        for help_item in HELP_STRS:
-            arrow, key, ops = help_item
-            y -= separation
-
-            # Show help text for operations
-            if arrow:
-                arcade.draw_text(arrow,
-                        HELP_LEFT_X, y, arcade.color.WHITE,
-                        font_size=18,# font_name='symbol',
-                        anchor_x='left', anchor_y='top')
-            arcade.draw_text(key,
-                    HELP_LEFT_X+20, y, arcade.color.WHITE, font_size=18,
-                    anchor_x='left', anchor_y='top')
-            arcade.draw_text(ops,
-                    HELP_RIGHT_X, y, arcade.color.WHITE, font_size=18,
-                    anchor_x='right', anchor_y='top')
-
-            arcade.draw_text(START_STR,
-                    START_X, START_Y, arcade.color.WHITE, font_size=18,
-                    anchor_x='center', anchor_y='center')
-            arcade.draw_text(VERSION_STR, VERSION_X, VERSION_Y,
-                    arcade.color.WHITE,
-                    font_size=16, font_name='calibri', bold=True, italic=True,
-                    anchor_x='left', anchor_y='top')
+        self.text.draw()
 
     def on_mouse_press(self, _x, _y, _button, _modifiers):
         """If the user presses the mouse button, start the game. """
@@ -16,10 +16,14 @@ import os
 import getpass
 from enum import IntEnum
 
+import assets
+
 from common import Timer
+from scheduler import scheduler
 
 from common import SCREEN_WIDTH, SCREEN_HEIGHT
 from common import key_handler
+from text import TextLayer
 
 MAX_HIGH_SCORES = 10
 
@@ -34,6 +38,14 @@ HSCORE_COL1 = HSCORE_X_START + 4*HSCORE_AVG_WIDTH
 HSCORE_COL3 = HSCORE_X_END
 HSCORE_COL2 = HSCORE_COL3 - 12*HSCORE_AVG_WIDTH
 
+# Heading, x and anchor_x of each column: serial number, name, stage, score
+HSCORE_COLUMNS = [
+        (None, HSCORE_COL1, 'right'),
+        ('Name', HSCORE_COL1, 'left'),
+        ('Stage', HSCORE_COL2, 'center'),
+        ('Score', HSCORE_COL3, 'right'),
+        ]
+
 SKULL_W = 30
 SKULL_H = 30
 SKULL_CX = HSCORE_X_START + SKULL_W // 2
@@ -62,7 +74,25 @@ class HscoreView(arcade.View):
         self.read_high_scores()
 
         # Load skull image
-        self.skull = arcade.load_texture('resources/images/skule.png', can_cache=True)
+        self.skull = assets.texture('skule.png')
+
+        # Title and column headings
+        self.text = TextLayer()
+        self.text.add('HIGH SCORES', SCREEN_WIDTH/2, HSCORE_Y_START,
+                font_name='fixed', font_size=18,
+                anchor_x='center', anchor_y='center')
+        for heading, x, anchor_x in HSCORE_COLUMNS[1:]:
+            self.text.add(heading, x, HSCORE_Y_START - HSCORE_Y_SEP,
+                    font_name='fixed', font_size=18,
+                    anchor_x=anchor_x, anchor_y='center')
+
+        # Rows of labels for the entries, filled in by draw_score(): one
+        # more than the table holds, for an entry on its way out
+        self.rows = [[self.text.add('', x, 0, font_name='fixed',
+                font_size=18, anchor_x=anchor_x, anchor_y='center') \
+                for heading, x, anchor_x in HSCORE_COLUMNS] \
+                for i in range(MAX_HIGH_SCORES + 1)]
+        self.nrows = 0
 
         self.init_vars()
 
@@ -107,8 +137,11 @@ class HscoreView(arcade.View):
         if self.count > self.statetc[int(self.state)]:
             self.change_state()
 
+    def on_hide_view(self):
+        self.timer.stop()
+
     def on_update(self, delta_time: float):
-        self.timer.update(delta_time)
+        scheduler.update(delta_time)
 
     #
     # FILE OPERATIONS
@@ -191,56 +224,23 @@ class HscoreView(arcade.View):
     # DRAW ROUTINES
     #
     def draw_score(self, i, sl, entry, y_offset=0):
-        arcade.draw_text(str(sl)+'- ',
-                HSCORE_COL1, HSCORE_Y_START-(i+2)*HSCORE_Y_SEP + y_offset,
-                arcade.color.WHITE,
-                font_name='fixed', font_size=18,
-                anchor_x='right', anchor_y='center')
-        arcade.draw_text(entry[0],
-                HSCORE_COL1, HSCORE_Y_START-(i+2)*HSCORE_Y_SEP + y_offset,
-                arcade.color.WHITE,
-                font_name='fixed', font_size=18,
-                anchor_x='left', anchor_y='center')
-        arcade.draw_text(entry[1],
-                HSCORE_COL2, HSCORE_Y_START-(i+2)*HSCORE_Y_SEP + y_offset,
-                arcade.color.WHITE,
-                font_name='fixed', font_size=18,
-                anchor_x='center', anchor_y='center')
-        arcade.draw_text(entry[2],
-                HSCORE_COL3, HSCORE_Y_START-(i+2)*HSCORE_Y_SEP + y_offset,
-                arcade.color.WHITE,
-                font_name='fixed', font_size=18,
-                anchor_x='right', anchor_y='center')
+        """Show entry on the next free row of labels"""
+        y = HSCORE_Y_START-(i+2)*HSCORE_Y_SEP + y_offset
+        for label, text in zip(self.rows[self.nrows], [str(sl)+'- '] + entry):
+            label.text = text
+            label.y = y
+            label.visible = True
+        self.nrows += 1
 
     def on_draw(self):
         """Draw high scores"""
         arcade.start_render()
 
-        # Draw title
-        arcade.draw_text('HIGH SCORES',
-                SCREEN_WIDTH/2, HSCORE_Y_START, arcade.color.WHITE,
-                font_name='fixed', font_size=18,
-                anchor_x='center', anchor_y='center')
-        arcade.draw_text('Name',
-                HSCORE_COL1, HSCORE_Y_START - HSCORE_Y_SEP,
-                arcade.color.WHITE,
-                font_name='fixed', font_size=18,
-                anchor_x='left', anchor_y='center')
-        arcade.draw_text('Stage',
-                HSCORE_COL2, HSCORE_Y_START - HSCORE_Y_SEP,
-                arcade.color.WHITE,
-                font_name='fixed', font_size=18,
-                anchor_x='center', anchor_y='center')
-        arcade.draw_text('Score',
-                HSCORE_COL3, HSCORE_Y_START - HSCORE_Y_SEP,
-                arcade.color.WHITE,
-                font_name='fixed', font_size=18,
-                anchor_x='right', anchor_y='center')
-
         # Draw high scores
         # State transition: ERASE -> MOVE_DOWN -> WRITE_NEW -> FINISH
         # One special case handled in change_state() above
         # State transition: ERASE -> WRITE_NEW -> FINISH
+        self.nrows = 0
 
         # ..Upto insert_pos
         for i, entry in enumerate(self.hscores[:self.insert_pos]):
@@ -264,6 +264,22 @@ class HscoreView(arcade.View):
         if self.state == State.ERASE:
             self.draw_score(9, 10, self.delete_entry, offset)
 
+        if self.state == State.WRITE_NEW:
+            self.draw_score(self.insert_pos, self.insert_pos+1, self.insert_entry)
+
+        if self.state == State.FINISH:
+            # Animation sequence completed, just show all the scores
+            for i, entry in enumerate(self.hscores):
+                self.draw_score(i, i+1, entry)
+
+        # Hide the rows not used, and draw all the text
+        for row in self.rows[self.nrows:]:
+            for label in row:
+                label.visible = False
+        self.text.draw()
+
+        # Then cover up what's being erased or is yet to be written
+        if self.state == State.ERASE:
             # Animate skull erasing old entry at position 10
             mwidth = self.count*STEP
             arcade.draw_rectangle_filled(SKULL_CX + mwidth // 2, SKULL_CY,
@@ -273,17 +289,11 @@ class HscoreView(arcade.View):
 
         if self.state == State.WRITE_NEW:
             mwidth = HSCORE_X_SIZE - self.count*STEP
-            self.draw_score(self.insert_pos, self.insert_pos+1, self.insert_entry)
             arcade.draw_rectangle_filled(
                     HSCORE_X_END - mwidth // 2,
                     HSCORE_Y_START - (self.insert_pos+2)*HSCORE_Y_SEP,
                     mwidth, 1.5*HSCORE_Y_SIZE, arcade.color.BLACK)
 
-        if self.state == State.FINISH:
-            # Animation sequence completed, just show all the scores
-            for i, entry in enumerate(self.hscores):
-                self.draw_score(i, i+1, entry)
-
     #
     # HANDLE USER INPUT
     #
@@ -16,14 +16,17 @@ License:        GPL (See LICENSE file for details)
 import arcade
 from enum import IntEnum
 
+import assets
+
 from common import Timer
+from scheduler import scheduler
 
 from common import SCREEN_WIDTH, SCREEN_HEIGHT
 from common import MARGIN_X, MARGIN_Y, BOARD_X, BOARD_Y
 from common import PIECE_SIZE, LOGO_Y, LOGO_H
 from common import START_STR, START_X, START_Y
-from common import VERSION_STR, VERSION_X, VERSION_Y
 from common import key_handler
+from text import TextLayer
 
 PRESENT_STR = 'Presenting...'
 PRESENT_X = 100
@@ -60,10 +63,23 @@ class IntroView(arcade.View):
         self.timertc = [200, 2, 200, 2, 1000]  # in millisecs
 
         # Load logo image
-        self.logo = arcade.load_texture('resources/images/biglogo.png',
-                can_cache=True)
+        self.logo = assets.texture('biglogo.png')
         self.init_vars()
 
+        # Text, laid out once
+        self.text = TextLayer()
+        self.present_text = self.text.add('', PRESENT_X, PRESENT_Y,
+                arcade.color.YELLOW, font_size=24,
+                anchor_x='left', anchor_y='top')
+        self.by_text = [
+                self.text.add(THANK_STR, THANK_X, THANK_Y,
+                    font_size=16, font_name='calibri', bold=True,
+                    italic=True, anchor_x='center', anchor_y='center'),
+                self.text.add(START_STR, START_X, START_Y,
+                    font_size=16, font_name='calibri', bold=True,
+                    italic=True, anchor_x='center', anchor_y='center'),
+                self.text.add_version()]
+
     def init_vars(self):
         self.state = State.PRESENT
         self.count = 0                  # number of ticks of timer
@@ -99,8 +115,11 @@ class IntroView(arcade.View):
             self.shinex = (SCREEN_WIDTH - BIGLOGO_W) / 2
             self.shinedir = 'forward'
 
+    def on_hide_view(self):
+        self.timer.stop()
+
     def on_update(self, delta_time: float):
-        self.timer.update(delta_time)
+        scheduler.update(delta_time)
 
     def on_draw(self):
         """Draw this view"""
@@ -117,11 +136,9 @@ class IntroView(arcade.View):
             gwidth = BIGLOGO_W
 
 
-        if self.state >= State.PRESENT:
-            # Draw progressively more of presentation text
-            arcade.draw_text(PRESENT_STR[:tlen],
-                    PRESENT_X, PRESENT_Y, arcade.color.YELLOW, font_size=24,
-                    anchor_x='left', anchor_y='top')
+        # Draw progressively more of presentation text
+        self.present_text.text = PRESENT_STR[:tlen]
+        self.present_text.visible = self.state >= State.PRESENT
 
         if self.state >= State.LOGO:
             # Unhide progressively more of logo
@@ -170,20 +187,10 @@ class IntroView(arcade.View):
             arcade.draw_texture_rectangle(PHASE_CX, PHASE_CY,
                     BIGLOGO_W, BIGLOGO_H, self.logo)
 
-        if self.state >= State.BY:
-            # Show other text
-            arcade.draw_text(THANK_STR,
-                    THANK_X, THANK_Y, arcade.color.WHITE,
-                    font_size=16, font_name='calibri', bold=True, italic=True,
-                    anchor_x='center', anchor_y='center')
-            arcade.draw_text(START_STR,
-                    START_X, START_Y, arcade.color.WHITE,
-                    font_size=16, font_name='calibri', bold=True, italic=True,
-                    anchor_x='center', anchor_y='center')
-            arcade.draw_text(VERSION_STR,
-                    VERSION_X, VERSION_Y, arcade.color.WHITE,
-                    font_size=16, font_name='calibri', bold=True, italic=True,
-                    anchor_x='left', anchor_y='top')
+        # Show other text
+        for label in self.by_text:
+            label.visible = self.state >= State.BY
+        self.text.draw()
 
     #
     # HANDLE USER INPUT
@@ -0,0 +1,98 @@
+"""
+File:           matching.py
+Description:    Vectorized match detection with NumPy
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+NumPy is optional; the engine falls back to its own scan without it.
+
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from common import JEWEL_SCORE, MIN_RUN
+
+# Directions of the scan lines, as (row, col) steps:
+# horizontal, vertical, and the two diagonals
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def points(n, min_run=MIN_RUN):
+    """Points for a single run of n matching jewels"""
+    return JEWEL_SCORE + (n-min_run)*JEWEL_SCORE//2
+
+
+def find_matches_np(boards, min_run=MIN_RUN):
+    """Find runs of min_run or more matching jewels in any direction
+
+    boards  One board, shape (nrows, ncols), or a stack of boards,
+            shape (B, nrows, ncols). 0 is an empty cell.
+
+    Returns a boolean mask of the cells in such runs (same shape as boards),
+    and the points for all the runs: an int for one board, or an array of
+    B ints for a stack.
+
+    A run of n jewels contains n-min_run+1 overlapping windows of min_run,
+    and scores 300 + (n-min_run)*150 = 150 * ((n-min_run+1) + 1). So the
+    points are 150 times the number of windows plus the number of runs, and
+    both can be counted with shifted-array comparisons instead of walking
+    each line.
+    """
+    if np is None:
+        raise ImportError('find_matches_np() needs numpy')
+
+    b = np.asarray(boards)
+    single = b.ndim == 2
+    if single:
+        b = b[np.newaxis]
+    nb, nrows, ncols = b.shape
+    k = min_run - 1         # Furthest shift
+
+    # Pad with k empty cells all round, so every shift stays in bounds
+    padded = np.zeros((nb, nrows+2*k, ncols+2*k), dtype=b.dtype)
+    padded[:, k:k+nrows, k:k+ncols] = b
+    starts = np.zeros(padded.shape, dtype=bool)
+
+    def shifted(a, dr, dc):
+        # View of a (padded) shifted by dr rows and dc cols
+        return a[:, k+dr:k+dr+nrows, k+dc:k+dc+ncols]
+
+    mask = np.zeros(b.shape, dtype=bool)
+    windows = np.zeros(nb, dtype=np.int64)
+    runs = np.zeros(nb, dtype=np.int64)
+    x = shifted(padded, 0, 0)
+    for dr, dc in DIRECTIONS:
+        # A window starts at a cell if it and the next k cells match
+        w = shifted(starts, 0, 0)
+        np.not_equal(x, 0, out=w)
+        for i in range(1, min_run):
+            w &= shifted(padded, i*dr, i*dc) == x
+
+        # Cells covered by a window starting here or up to k cells back
+        prev = shifted(starts, -dr, -dc)
+        for i in range(min_run):
+            mask |= shifted(starts, -i*dr, -i*dc)
+
+        # A run starts with a window that isn't preceded by another
+        windows += w.sum(axis=(1, 2))
+        runs += (w & ~prev).sum(axis=(1, 2))
+
+    pts = (JEWEL_SCORE//2) * (windows + runs)
+    if single:
+        return mask[0], int(pts[0])
+    return mask, pts
+
+
+def match_cells(mask):
+    """Set of (row, col) cells in a mask from find_matches_np()"""
+    return set(map(tuple, np.argwhere(mask).tolist()))
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""
+File:           pack.py
+Description:    Pack of pre-decoded images
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+All the images in resources/images, decoded to RGBA once at build time and
+stored in a single file. At run time the file is memory-mapped, and images
+are made straight from the mapped bytes, with no PNG decoding and no copy.
+
+File format (little-endian):
+    header  magic b'PJPK', version (1 byte), number of images (2)
+    index   for each image: length of its name (1), name (UTF-8),
+            width (2), height (2), offset (4) and size (4) of its data
+    data    RGBA pixels of each image, top row first, each starting on an
+            ALIGN boundary
+
+Rebuild the pack after changing any image; until then the game loads the
+PNGs, as it does when the pack is missing or damaged.
+
+Usage:
+    python pack.py [--images DIR] [-o FILE]
+
+"""
+
+import os
+import sys
+import mmap
+import struct
+import argparse
+
+import PIL.Image
+
+IMAGE_DIR = 'resources/images/'
+PACK_FILE = 'resources/images.pack'
+
+MAGIC = b'PJPK'
+VERSION = 1
+HEADER = struct.Struct('<4sBH')
+ENTRY = struct.Struct('<HHII')
+ALIGN = 16
+
+
+class PackError(ValueError):
+    """Not a pack, or a damaged one"""
+
+
+def build(image_dir=IMAGE_DIR, path=PACK_FILE, names=None):
+    """Decode the images (default: every PNG in image_dir) into a pack
+
+    Returns the names of the images packed.
+    """
+    if names is None:
+        names = sorted(n for n in os.listdir(image_dir) if n.endswith('.png'))
+
+    images = []
+    for name in names:
+        image = PIL.Image.open(os.path.join(image_dir, name)).convert('RGBA')
+        images.append((name.encode('utf-8'), image.size, image.tobytes()))
+
+    index_size = HEADER.size + sum(1 + len(name) + ENTRY.size \
+            for name, size, data in images)
+    index = bytearray(HEADER.pack(MAGIC, VERSION, len(images)))
+    offset = index_size
+    offsets = []
+    for name, (w, h), data in images:
+        offset += -offset % ALIGN
+        offsets.append(offset)
+        index.append(len(name))
+        index += name
+        index += ENTRY.pack(w, h, offset, len(data))
+        offset += len(data)
+
+    with open(path, 'wb') as f:
+        f.write(index)
+        for (name, size, data), offset in zip(images, offsets):
+            f.write(bytes(offset - f.tell()))
+            f.write(data)
+    return names
+
+
+def is_stale(path=PACK_FILE, image_dir=IMAGE_DIR):
+    """Has any PNG in image_dir changed since the pack was built?"""
+    built = os.path.getmtime(path)
+    return any(os.path.getmtime(os.path.join(image_dir, n)) > built \
+            for n in os.listdir(image_dir) if n.endswith('.png'))
+
+
+class Pack:
+    """A memory-mapped pack of images
+
+    Raises PackError if the file isn't a whole pack.
+    """
+
+    def __init__(self, path=PACK_FILE):
+        with open(path, 'rb') as f:
+            # (An empty file can't be mapped)
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise PackError('pack is truncated')
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.data)
+        try:
+            self.read_index()
+        except (IndexError, struct.error, UnicodeDecodeError):
+            self.close()
+            raise PackError('pack is truncated')
+        except PackError:
+            self.close()
+            raise
+
+    def read_index(self):
+        magic, version, count = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise PackError('not an image pack')
+        if version != VERSION:
+            raise PackError('unknown pack version {}'.format(version))
+
+        self.index = {}     # name: (width, height, offset, size)
+        pos = HEADER.size
+        for i in range(count):
+            n = self.data[pos]
+            name = bytes(self.data[pos+1:pos+1+n]).decode('utf-8')
+            pos += 1 + n
+            entry = ENTRY.unpack_from(self.data, pos)
+            pos += ENTRY.size
+            w, h, offset, size = entry
+            if size != 4*w*h:
+                raise PackError('bad size of image {}'.format(name))
+            if offset + size > len(self.data):
+                raise PackError('pack is truncated')
+            self.index[name] = entry
+
+    def close(self):
+        self.view.release()
+        self.data.close()
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def names(self):
+        return list(self.index)
+
+    def image(self, name):
+        """RGBA image of name, backed by the mapped file"""
+        w, h, offset, size = self.index[name]
+        return PIL.Image.frombuffer('RGBA', (w, h),
+                self.view[offset:offset+size], 'raw', 'RGBA', 0, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description='Pack the images, decoded, into one file')
+    parser.add_argument('--images', default=IMAGE_DIR,
+            help='directory of PNG images')
+    parser.add_argument('-o', '--output', default=PACK_FILE)
+    args = parser.parse_args(argv)
+
+    names = build(args.images, args.output)
+    print('{}: {} images, {} bytes'.format(args.output, len(names),
+            os.path.getsize(args.output)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -0,0 +1,153 @@
+"""
+File:           profiler.py
+Description:    Frame profiler, with an overlay and Chrome trace output
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+Methods decorated with @timed('name') are timed while the profiler is
+enabled; while it's disabled they cost one extra call and a flag check.
+The game view calls frame() once per frame, and draws an Overlay of the
+numbers. The timings of the last MAX_EVENTS calls can be saved as a
+Chrome trace (chrome://tracing, or https://ui.perfetto.dev).
+
+"""
+
+import os
+import json
+import time
+import functools
+from collections import deque, defaultdict
+
+NFRAMES = 300           # Frames kept for the statistics
+MAX_EVENTS = 100000     # Calls kept for the trace
+
+
+class Profiler:
+    """Time spent per frame in each timed section"""
+
+    def __init__(self, nframes=NFRAMES, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.frame_times = deque(maxlen=nframes)
+        self.sections = defaultdict(lambda: deque(maxlen=nframes))
+        self.events = deque(maxlen=max_events)
+        self.current = defaultdict(float)   # Section times this frame
+        self.last_frame = None
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        self.last_frame = None
+
+    def toggle(self):
+        self.enable(not self.enabled)
+
+    def add(self, name, start, end):
+        """Note a timed call of section name"""
+        self.current[name] += end - start
+        self.events.append((name, start, end))
+
+    def frame(self):
+        """Mark the end of a frame"""
+        if not self.enabled: return
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.frame_times.append(now - self.last_frame)
+        self.last_frame = now
+
+        for name in self.sections.keys() | self.current.keys():
+            self.sections[name].append(self.current.get(name, 0.0))
+        self.current.clear()
+
+    #
+    # STATISTICS
+    #
+    def fps(self):
+        total = sum(self.frame_times)
+        return len(self.frame_times) / total if total else 0.0
+
+    def percentile(self, p):
+        """Frame time (seconds) that p percent of frames come within"""
+        if not self.frame_times:
+            return 0.0
+        times = sorted(self.frame_times)
+        return times[min(len(times)-1, int(len(times) * p / 100))]
+
+    def section_times(self):
+        """Mean time per frame (seconds) of each section, by name"""
+        return {name: sum(times) / len(times) \
+                for name, times in sorted(self.sections.items()) if times}
+
+    #
+    # TRACE
+    #
+    def save_trace(self, path):
+        """Save the timed calls as a Chrome trace (JSON)"""
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'ts': start*1e6,
+                'dur': (end - start)*1e6, 'pid': pid, 'tid': 0} \
+                for name, start, end in self.events]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events,
+                    'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+
+# The profiler the game uses
+profiler = Profiler()
+
+
+def timed(name):
+    """Decorator: time calls of the function as section name"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.add(name, start, time.perf_counter())
+        return wrapper
+    return decorate
+
+
+class Overlay:
+    """Profiler numbers drawn over a view
+
+    counts  Function returning a list of (name, value) to show below the
+            timings, e.g. sprite counts
+    """
+    NLINES = 16
+
+    def __init__(self, x, y, counts=None, line_height=18):
+        # Imported here so the profiler itself doesn't need arcade
+        import arcade
+        from text import TextLayer
+
+        self.counts = counts
+        self.text = TextLayer()
+        self.lines = [self.text.add('', x, y - line_height*i,
+                arcade.color.YELLOW, font_name='fixed', font_size=11) \
+                for i in range(self.NLINES)]
+
+    def draw(self, p=profiler):
+        lines = ['FPS {:6.1f}'.format(p.fps()),
+                'frame p50 {:6.2f} ms  p99 {:6.2f} ms'.format(
+                1000*p.percentile(50), 1000*p.percentile(99))]
+        for name, t in p.section_times().items():
+            lines.append('{:<16} {:6.2f} ms'.format(name, 1000*t))
+        if self.counts:
+            for name, value in self.counts():
+                lines.append('{:<16} {:>6}'.format(name, value))
+
+        for label, line in zip(self.lines,
+                lines + [''] * (self.NLINES - len(lines))):
+            label.text = line
+        self.text.draw()
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -60,23 +60,36 @@ ORIGINAL NOTATIONS
 ----------------------------------------------------------------------------
 """
 
+import os
 import sys
-import random
-import arcade
 
 from common import SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE
 
-from intro_view import IntroView
-from help_view import HelpView
-from game_view import GameView
-from hscore_view import HscoreView
-
 if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
     os.chdir(sys._MEIPASS)
 
+USAGE = """usage: pyjewel [command] [options]
+
+With no command, play the game. Commands:
+    simulate    Play games headlessly and report statistics
+    replay FILE Rerun a recorded game headlessly and check its score
+    verify      Check the score and stage of recorded games (files or
+                directories), over a pool of processes
+    benchmark   Run the benchmarks (see benchmark.py)
+    train       Tune the bot's evaluation weights by self-play
+    server      Serve headless games over the network, or load a server
+                with games (see server.py)
+"""
 
-def main():
-    """ Main method """
+
+def make_window():
+    """Open the game window, with all its views"""
+    # Imported here so the headless commands don't need arcade
+    import arcade
+    from intro_view import IntroView
+    from help_view import HelpView
+    from game_view import GameView
+    from hscore_view import HscoreView
 
     window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
 
@@ -85,13 +98,53 @@ def main():
     window.help_view = HelpView()
     window.hscore_view = HscoreView()
     window.game_view = GameView()
+    return window
+
+
+def play():
+    """Open the game window and play"""
+    import arcade
+
+    window = make_window()
 
     # Switch to the intro view
     window.show_view(window.intro_view)
     arcade.run()
 
 
+def main(argv=None):
+    """ Main method """
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else None
+
+    if command is None:
+        play()
+    elif command == 'simulate':
+        import simulate
+        return simulate.main(argv[1:], prog='pyjewel simulate')
+    elif command == 'replay':
+        import replay
+        return replay.main(argv[1:])
+    elif command == 'verify':
+        import verify
+        return verify.main(argv[1:], prog='pyjewel verify')
+    elif command == 'benchmark':
+        import benchmark
+        return benchmark.main(argv[1:], prog='pyjewel benchmark')
+    elif command == 'train':
+        import train
+        return train.main(argv[1:], prog='pyjewel train')
+    elif command == 'server':
+        import server
+        return server.main(argv[1:], prog='pyjewel server')
+    elif command in ('-h', '--help', 'help'):
+        print(USAGE)
+    else:
+        print(USAGE, file=sys.stderr)
+        return 2
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
 # vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -0,0 +1,223 @@
+"""
+File:           replay.py
+Description:    Recording and replaying games
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+A game is fully determined by the engine's seed, its settings and the
+player's inputs, each tagged with the engine tick it came in. A replay
+keeps just that, and reruns it through the headless engine, without any
+of the timer waits of the game view.
+
+File format (little-endian):
+    header  magic b'PJRP', version (1 byte), seed (8), ncols (2),
+            nrows (2), block_size (1), min_run (1), pieces_per_stage (2),
+            avg_blocks_between_jewels (2)
+    inputs  one byte per input: action in the low 3 bits, ticks since the
+            previous input in the high 5. A delta of 31 or more is stored
+            as 31, followed by a varint of the rest.
+    end     an input with the END action, whose delta runs up to the last
+            tick of the game; then the final score and stage as varints.
+
+The speeds table isn't stored: it only sets how long a tick lasts.
+
+Usage:
+    python replay.py FILE
+
+"""
+
+import sys
+import time
+import struct
+
+from engine import Engine
+from common import NCOLS, NROWS, BLOCK_SIZE, MIN_RUN
+from common import PIECES_PER_STAGE, AVG_BLOCKS_BETWEEN_JEWELS
+
+MAGIC = b'PJRP'
+VERSION = 1
+HEADER = struct.Struct('<4sBQHHBBHH')
+
+END = 7             # Marks the end of the inputs
+DELTA_BITS = 5
+MAX_DELTA = (1 << DELTA_BITS) - 1
+
+# Engine settings kept in the header, with their defaults
+CONFIG = (
+    ('ncols', NCOLS),
+    ('nrows', NROWS),
+    ('block_size', BLOCK_SIZE),
+    ('min_run', MIN_RUN),
+    ('pieces_per_stage', PIECES_PER_STAGE),
+    ('avg_blocks_between_jewels', AVG_BLOCKS_BETWEEN_JEWELS),
+)
+
+
+class ReplayError(ValueError):
+    """Not a replay, or a damaged one"""
+
+
+def write_varint(out, n):
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(data, pos):
+    """Returns the number at data[pos], and the position after it"""
+    n = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError('replay is truncated')
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7f) << shift
+        if not b & 0x80:
+            return n, pos
+        shift += 7
+
+
+class Replay:
+    """Seed, settings and inputs of one game
+
+    inputs  List of (tick, action), in order. tick is engine.ticks when the
+            input was applied: it goes in before that many advances.
+    ticks, score, stage
+            Where the game ended, as recorded by finish()
+    """
+
+    def __init__(self, seed, config=None, inputs=None):
+        self.seed = seed
+        self.config = dict(CONFIG)
+        self.config.update(config or {})
+        self.inputs = inputs or []
+        self.ticks = 0
+        self.score = 0
+        self.stage = 1
+
+    @classmethod
+    def for_engine(cls, engine):
+        """Empty replay of a game about to be played on engine"""
+        if engine.seed is None:
+            raise ReplayError('engine has no seed to replay from')
+        return cls(engine.seed,
+                {name: getattr(engine, name) for name, _ in CONFIG})
+
+    def record(self, tick, action):
+        self.inputs.append((tick, action))
+
+    def finish(self, engine):
+        """Note where the game ended"""
+        self.ticks = engine.ticks
+        self.score = engine.score
+        self.stage = engine.stage
+
+    def new_engine(self, **engine_args):
+        """Engine at the start of the game; engine_args are passed on"""
+        return Engine(seed=self.seed, **self.config, **engine_args)
+
+    def run(self, **engine_args):
+        """Replay the game headlessly. Returns the engine at its end."""
+        engine = self.new_engine(**engine_args)
+        for tick, action in self.inputs:
+            while engine.ticks < tick and not engine.game_over:
+                engine.tick()
+            engine.apply(action)
+        while engine.ticks < self.ticks and not engine.game_over:
+            engine.tick()
+        return engine
+
+    #
+    # FILE FORMAT
+    #
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.seed,
+                *(self.config[name] for name, _ in CONFIG)))
+
+        last = 0
+        for tick, action in self.inputs + [(self.ticks, END)]:
+            delta = tick - last
+            last = tick
+            if delta < MAX_DELTA:
+                out.append(delta << 3 | action)
+            else:
+                out.append(MAX_DELTA << 3 | action)
+                write_varint(out, delta - MAX_DELTA)
+
+        write_varint(out, self.score)
+        write_varint(out, self.stage)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError('replay is truncated')
+        magic, version, seed, *config = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError('not a replay')
+        if version != VERSION:
+            raise ReplayError('unknown replay version {}'.format(version))
+
+        replay = cls(seed, dict(zip((name for name, _ in CONFIG), config)))
+        pos = HEADER.size
+        tick = 0
+        while True:
+            if pos >= len(data):
+                raise ReplayError('replay is truncated')
+            b = data[pos]
+            pos += 1
+            delta, action = b >> 3, b & 7
+            if delta == MAX_DELTA:
+                rest, pos = read_varint(data, pos)
+                delta += rest
+            tick += delta
+            if action == END: break
+            replay.inputs.append((tick, action))
+
+        replay.ticks = tick
+        replay.score, pos = read_varint(data, pos)
+        replay.stage, pos = read_varint(data, pos)
+        return replay
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print('usage: replay.py FILE', file=sys.stderr)
+        return 2
+
+    replay = Replay.load(argv[0])
+    start = time.perf_counter()
+    engine = replay.run()
+    elapsed = time.perf_counter() - start
+
+    print('seed:     {}'.format(replay.seed))
+    print('inputs:   {} ({} bytes)'.format(len(replay.inputs),
+            len(replay.to_bytes())))
+    print('ticks:    {}'.format(replay.ticks))
+    print('recorded: stage {}, score {}'.format(replay.stage, replay.score))
+    print('replayed: stage {}, score {} in {:.1f} ms'.format(engine.stage,
+            engine.score, 1000*elapsed))
+    return 0 if (engine.stage, engine.score) == \
+            (replay.stage, replay.score) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
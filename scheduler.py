@@ -0,0 +1,122 @@
+"""
+File:           scheduler.py
+Description:    One scheduler for all the timers and delayed calls
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+Calls are kept in a heap by the time they are due. The view being shown
+calls scheduler.update() from its on_update(); when nothing is due that's
+a single look at the top of the heap. Cancelled calls are left in the heap
+and skipped when they come up.
+
+"""
+
+import heapq
+from itertools import count
+
+
+class Handle:
+    """A scheduled call, returned by call_later() and call_every()"""
+    __slots__ = ('time', 'seq', 'callback', 'args', 'interval', 'max_steps',
+            'cancelled')
+
+    def __init__(self, time, seq, callback, args, interval=None,
+            max_steps=None):
+        self.time = time
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.max_steps = max_steps
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.time, self.seq) < (other.time, other.seq)
+
+    def cancel(self):
+        self.cancelled = True
+
+    @property
+    def active(self):
+        """Still to be called (again)"""
+        return not self.cancelled
+
+
+class Scheduler:
+    """Calls functions after a delay, or every so often
+
+    now is the scheduler's own clock: the sum of the delta_times passed to
+    update().
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.heap = []
+        self.seq = count()      # Breaks ties in the order of scheduling
+
+    def __len__(self):
+        return sum(1 for h in self.heap if not h.cancelled)
+
+    def schedule(self, handle):
+        heapq.heappush(self.heap, handle)
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        """Call callback(*args) once, delay seconds from now"""
+        return self.schedule(Handle(self.now + delay, next(self.seq),
+                callback, args))
+
+    def call_every(self, interval, callback, *args, first=None,
+            max_steps=None):
+        """Call callback(*args) every interval seconds
+
+        first       Delay before the first call (default: interval)
+        max_steps   Most calls made by one update() when the calls have
+                    fallen behind; the time owed beyond that is dropped.
+                    Default: no limit.
+        """
+        if interval <= 0:
+            raise ValueError('interval must be more than 0')
+        first = interval if first is None else first
+        return self.schedule(Handle(self.now + first, next(self.seq),
+                callback, args, interval, max_steps))
+
+    def update(self, delta_time):
+        """Advance the clock, and make the calls that have come due"""
+        self.now += delta_time
+        heap = self.heap
+        steps = {}
+        while heap and heap[0].time <= self.now:
+            h = heapq.heappop(heap)
+            if h.cancelled: continue
+            if h.interval is None:
+                h.cancelled = True      # Done with, once called
+            h.callback(*h.args)
+            if h.cancelled: continue
+
+            # Repeating call: put it back for its next time
+            h.time += h.interval
+            n = steps[h] = steps.get(h, 0) + 1
+            if h.max_steps is not None and n >= h.max_steps and \
+                    h.time <= self.now:
+                # Too far behind: catch up no further
+                h.time = self.now + h.interval - \
+                        (self.now - h.time) % h.interval
+            h.seq = next(self.seq)
+            heapq.heappush(heap, h)
+
+    def clear(self):
+        for h in self.heap:
+            h.cancel()
+        self.heap = []
+
+
+# The scheduler the game's views share
+scheduler = Scheduler()
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -0,0 +1,483 @@
+#!/usr/bin/env python
+"""
+File:           server.py
+Description:    Game server for many headless games, and a load generator
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+One asyncio process runs every game on the server. Each game is an engine
+ticked by a single scheduler.Scheduler at the pace of its stage's speed,
+as the game view's timer would; the server's loop advances the scheduler
+once a frame. Players join games over TCP, send their inputs in batches,
+and get back, once a frame, an update of each of their games that changed:
+the cells of the board that changed, and the little else a client shows.
+
+Games joined with the same seed get the same blocks, so that two players
+can race each other on equal terms (versus mode).
+
+Messages (little-endian), each a FRAME header (payload length, type)
+followed by the payload:
+    JOIN    client: number of games (2), seed (8; 0 for a random seed
+            per game)
+    JOINED  server: number of games (2), then the id of each (4)
+    INPUTS  client: number of inputs (2), then for each the game id (4)
+            and an engine action (1)
+    UPDATE  server: number of games (2), then for each a GAME record,
+            the pieces of the falling and of the preview block (top first,
+            block_size each), and the changed cells as CHANGE records
+            (cell number r*ncols + c, piece)
+    ERROR   server: a JOIN refused, as it would take the server or the
+            connection over its limit of games; number of games asked for
+            (2), then the reason (UTF-8)
+
+Usage:
+    python server.py serve [--host HOST] [--port PORT] [--max-games N]
+            [--max-client-games N]
+    python server.py load [--games N] [--connections N] [--seconds S]
+
+"""
+
+import sys
+import time
+import random
+import struct
+import asyncio
+import argparse
+from itertools import chain
+
+from engine import Engine, EXIT
+from scheduler import Scheduler
+from common import SPEEDS, BLOCK_SIZE, MIN_DURATION, MAX_STEPS
+
+HOST = '127.0.0.1'
+PORT = 7474
+FRAME_TIME = MIN_DURATION       # Server frame: updates go out this often
+STATS_TIME = 5.0                # Seconds between the server's statistics
+MAX_BUFFER = 1 << 22            # Unsent bytes before a client is dropped
+MAX_GAMES = 20000               # Games running on the server at once
+MAX_CLIENT_GAMES = 5000         # ..and over one connection
+
+FRAME = struct.Struct('<IB')
+JOIN, JOINED, INPUTS, UPDATE, ERROR = 1, 2, 3, 4, 5
+
+JOIN_MSG = struct.Struct('<HQ')
+COUNT = struct.Struct('<H')
+GAME_ID = struct.Struct('<I')
+INPUT = struct.Struct('<IB')
+# id, ticks, score, stage, lives, flags, falling block row and col,
+# number of changed cells. The score takes 8 bytes: cascades double their
+# points at every step, and a long game can pass 2**32.
+GAME = struct.Struct('<IIQBBBBBH')
+CHANGE = struct.Struct('<HB')
+
+# GAME flags
+GAME_OVER = 1
+MOVING = 2          # The falling block is on the board
+
+
+def frame(kind, payload):
+    return FRAME.pack(len(payload), kind) + payload
+
+
+async def read_frame(reader):
+    """(type, payload) of the next message, or None at the end"""
+    try:
+        size, kind = FRAME.unpack(await reader.readexactly(FRAME.size))
+        return kind, await reader.readexactly(size)
+    except asyncio.IncompleteReadError:
+        return None
+
+
+class Game:
+    """A game on the server, and what its player last saw of it"""
+    __slots__ = ('id', 'engine', 'client', 'handle', 'board', 'hash',
+            'changed')
+
+    def __init__(self, id, engine, client):
+        self.id = id
+        self.engine = engine
+        self.client = client
+        self.handle = None
+        self.board = bytes(engine.ncols * engine.nrows)  # As last sent
+        self.hash = 0
+        self.changed = True
+
+    def encode(self):
+        """GAME record of the game, with what changed since last time"""
+        e = self.engine
+        changes = []
+        if e.board.hash != self.hash:
+            board = bytes(chain.from_iterable(e.board.tolist()))
+            self.hash = e.board.hash
+            changes = [(i, p) for i, (old, p) \
+                    in enumerate(zip(self.board, board)) if old != p]
+            self.board = board
+        self.changed = False
+
+        fb = e.falling_block
+        flags = (GAME_OVER if e.game_over else 0) | \
+                (MOVING if fb.ismoving else 0)
+        out = bytearray(GAME.pack(self.id, e.ticks, e.score, e.stage,
+                e.lives, flags, fb.row, fb.col, len(changes)))
+        out += bytes(fb.pieces) + bytes(e.preview_block.pieces)
+        for change in changes:
+            out += CHANGE.pack(*change)
+        return out
+
+
+class Client:
+    """A connection, and the games played over it"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.games = {}
+
+    def flush(self):
+        """Send an update of the games that changed"""
+        changed = [g for g in self.games.values() if g.changed]
+        if not changed:
+            return 0
+        payload = bytearray(COUNT.pack(len(changed)))
+        for game in changed:
+            payload += game.encode()
+        data = frame(UPDATE, payload)
+        self.writer.write(data)
+        return len(data)
+
+
+class Server:
+    """Runs all the games, from one scheduler
+
+    max_games           Games running at once, at most
+    max_client_games    ..and over one connection
+    engine_args are passed on to each game's Engine.
+    """
+
+    def __init__(self, max_games=MAX_GAMES, max_client_games=MAX_CLIENT_GAMES,
+            **engine_args):
+        self.max_games = max_games
+        self.max_client_games = max_client_games
+        self.engine_args = engine_args
+        self.scheduler = Scheduler()
+        self.clients = set()
+        self.next_id = 1
+        self.ngames = 0
+        self.ticks = 0          # Engine ticks, and bytes sent, since the
+        self.sent = 0           # last statistics
+        self.busy = 0.0
+
+    #
+    # GAMES
+    #
+    def refusal(self, client, count):
+        """Why count more games can't join, or None if they can"""
+        if self.ngames + count > self.max_games:
+            return 'server full ({} games)'.format(self.max_games)
+        running = sum(1 for g in client.games.values() \
+                if not g.engine.game_over)
+        if running + count > self.max_client_games:
+            return 'too many games on one connection ({} at most)'.format(
+                    self.max_client_games)
+        return None
+
+    def join(self, client, count, seed):
+        ids = []
+        for i in range(count):
+            game = Game(self.next_id, Engine(seed=seed or None,
+                    **self.engine_args), client)
+            self.next_id += 1
+            game.handle = self.scheduler.call_every(
+                    max(game.engine.speed, MIN_DURATION), self.tick, game,
+                    max_steps=MAX_STEPS)
+            client.games[game.id] = game
+            self.ngames += 1
+            ids.append(game.id)
+        return ids
+
+    def tick(self, game):
+        engine = game.engine
+        engine.tick()
+        self.ticks += 1
+        game.changed = True
+        # The stage may have changed the speed (clamped as common.Timer
+        # clamps it: the last stages have a speed of 0)
+        game.handle.interval = max(engine.speed, MIN_DURATION)
+        if engine.game_over:
+            self.end(game)
+
+    def apply(self, client, data):
+        """Apply a batch of inputs"""
+        for offset in range(COUNT.size, len(data), INPUT.size):
+            game_id, action = INPUT.unpack_from(data, offset)
+            game = client.games.get(game_id)
+            if game is None or game.engine.game_over or action > EXIT:
+                continue
+            game.engine.apply(action)
+            game.changed = True
+            if game.engine.game_over:
+                self.end(game)
+
+    def end(self, game):
+        """Stop a game; its last update still goes out"""
+        game.handle.cancel()
+        self.ngames -= 1
+
+    def drop(self, client):
+        for game in client.games.values():
+            if not game.engine.game_over:
+                self.end(game)
+        client.games.clear()
+        self.clients.discard(client)
+
+    #
+    # NETWORK
+    #
+    async def handle(self, reader, writer):
+        client = Client(writer)
+        self.clients.add(client)
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message is None:
+                    break
+                kind, data = message
+                if kind == JOIN:
+                    count, seed = JOIN_MSG.unpack(data)
+                    reason = self.refusal(client, count)
+                    if reason is not None:
+                        writer.write(frame(ERROR, COUNT.pack(count) + \
+                                reason.encode()))
+                        continue
+                    ids = self.join(client, count, seed)
+                    writer.write(frame(JOINED, COUNT.pack(len(ids)) + \
+                            b''.join(GAME_ID.pack(i) for i in ids)))
+                elif kind == INPUTS:
+                    self.apply(client, data)
+        except (ConnectionError, struct.error):
+            pass
+        finally:
+            self.drop(client)
+            writer.close()
+
+    def flush(self):
+        for client in list(self.clients):
+            if client.writer.transport.get_write_buffer_size() > MAX_BUFFER:
+                # Not keeping up with its updates
+                self.drop(client)
+                client.writer.close()
+                continue
+            self.sent += client.flush()
+            # Games over, and sent as such, are done with
+            for game_id in [i for i, g in client.games.items() \
+                    if g.engine.game_over]:
+                del client.games[game_id]
+
+    async def run(self, host=HOST, port=PORT, quiet=False):
+        server = await asyncio.start_server(self.handle, host, port)
+        loop = asyncio.get_running_loop()
+        if not quiet:
+            print('Serving on {}:{}'.format(host, port))
+
+        last = stats = loop.time()
+        async with server:
+            while True:
+                await asyncio.sleep(FRAME_TIME)
+                now = loop.time()
+                start = time.perf_counter()
+                self.scheduler.update(now - last)
+                self.flush()
+                self.busy += time.perf_counter() - start
+                last = now
+
+                if now - stats >= STATS_TIME and not quiet:
+                    elapsed = now - stats
+                    print('games {:>6}  ticks/s {:>8.0f}  load {:5.1f}%  '
+                            'sent {:>8.1f} kB/s'.format(self.ngames,
+                            self.ticks/elapsed, 100*self.busy/elapsed,
+                            self.sent/elapsed/1000))
+                    self.ticks = self.sent = 0
+                    self.busy = 0.0
+                    stats = now
+
+
+#
+# LOAD GENERATOR
+#
+class Load:
+    """Keeps a number of games going on a server, pressing random keys
+
+    Compares the ticks that come back with the ticks the games' speeds
+    call for: a pace of 1.0 means every game is ticking on time.
+    """
+
+    def __init__(self, games, rate, rng):
+        self.games = games
+        self.rate = rate            # Inputs per game per second
+        self.rng = rng
+        self.last = {}              # game id: (time, ticks) of last update
+        self.updates = self.received = self.inputs = 0
+        self.ticks = 0
+        self.expected = 0.0
+        self.ended = 0
+        self.refused = 0            # Games the server wouldn't start
+
+    def parse(self, data, now, block_size):
+        """Note an UPDATE; returns the ids of the games that ended"""
+        (count,) = COUNT.unpack_from(data)
+        offset = COUNT.size
+        ended = []
+        for i in range(count):
+            game_id, ticks, score, stage, lives, flags, row, col, nchanges = \
+                    GAME.unpack_from(data, offset)
+            offset += GAME.size + 2*block_size + nchanges*CHANGE.size
+            self.updates += 1
+
+            t0, ticks0 = self.last.get(game_id, (now, ticks))
+            self.ticks += ticks - ticks0
+            self.expected += (now - t0) / max(SPEEDS[stage], MIN_DURATION)
+            self.last[game_id] = (now, ticks)
+            if flags & GAME_OVER:
+                del self.last[game_id]
+                ended.append(game_id)
+        return ended
+
+    def inputs_for(self, games, elapsed):
+        """A batch of random inputs to games for elapsed seconds of play"""
+        n = min(len(games), int(self.rng.random() + \
+                self.rate * elapsed * len(games)))
+        ids = self.rng.sample(sorted(games), n)
+        self.inputs += n
+        return frame(INPUTS, COUNT.pack(n) + b''.join(INPUT.pack(i,
+                self.rng.randrange(1, EXIT)) for i in ids))
+
+    async def connection(self, host, port, games, seconds, block_size):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(frame(JOIN, JOIN_MSG.pack(games, 0)))
+        loop = asyncio.get_running_loop()
+        end = loop.time() + seconds
+        last = loop.time()
+        mine = set()        # Ids of the games of this connection
+        while True:
+            now = loop.time()
+            if now >= end:
+                break
+            try:
+                message = await asyncio.wait_for(read_frame(reader),
+                        end - now)
+            except asyncio.TimeoutError:
+                break
+            if message is None:
+                break
+            kind, data = message
+            self.received += FRAME.size + len(data)
+            if kind == JOINED:
+                mine.update(GAME_ID.unpack_from(data, offset)[0] \
+                        for offset in range(COUNT.size, len(data),
+                        GAME_ID.size))
+            elif kind == UPDATE:
+                ended = self.parse(data, loop.time(), block_size)
+                if ended:
+                    # Keep the number of games up
+                    self.ended += len(ended)
+                    mine.difference_update(ended)
+                    writer.write(frame(JOIN, JOIN_MSG.pack(len(ended), 0)))
+                writer.write(self.inputs_for(mine, now - last))
+                last = now
+            elif kind == ERROR:
+                (count,) = COUNT.unpack_from(data)
+                self.refused += count
+                if not mine:
+                    print('JOIN refused: {}'.format(
+                            data[COUNT.size:].decode()), file=sys.stderr)
+                    break
+        writer.close()
+
+    async def run(self, host, port, connections, seconds, block_size):
+        per = [self.games // connections + (i < self.games % connections) \
+                for i in range(connections)]
+        await asyncio.gather(*(self.connection(host, port, n, seconds,
+                block_size) for n in per if n))
+
+
+async def serve_and_load(args):
+    """Run a server, and load it, in this one process"""
+    server = Server()
+    task = asyncio.ensure_future(server.run(args.host, args.port,
+            quiet=True))
+    await asyncio.sleep(0.2)
+    load = Load(args.games, args.rate, random.Random(args.seed))
+    await load.run(args.host, args.port, args.connections, args.seconds,
+            args.block_size)
+    task.cancel()
+    return load, server
+
+
+def report(load, seconds):
+    print('games:        {} ({} ended and replaced, {} refused)'.format(
+            load.games, load.ended, load.refused))
+    print('updates/sec:  {:.0f}'.format(load.updates / seconds))
+    print('ticks/sec:    {:.0f}'.format(load.ticks / seconds))
+    print('pace:         {:.3f} (ticks received / ticks due)'.format(
+            load.ticks / load.expected if load.expected else 0.0))
+    print('inputs/sec:   {:.0f}'.format(load.inputs / seconds))
+    print('received:     {:.1f} kB/s, {:.1f} bytes/update'.format(
+            load.received / seconds / 1000,
+            load.received / max(load.updates, 1)))
+
+
+def parse_args(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog,
+            description='Game server, and a load generator for it')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('serve', help='run the server')
+    p.add_argument('--max-games', type=int, default=MAX_GAMES,
+            help='games running at once, at most')
+    p.add_argument('--max-client-games', type=int, default=MAX_CLIENT_GAMES,
+            help='games running over one connection, at most')
+
+    p = subparsers.add_parser('load',
+            help='play many games on a server, and report how it keeps up')
+    p.add_argument('--games', type=int, default=1000)
+    p.add_argument('--connections', type=int, default=10)
+    p.add_argument('--seconds', type=float, default=30.0)
+    p.add_argument('--rate', type=float, default=1.0,
+            help='inputs per game per second')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--block-size', type=int, default=BLOCK_SIZE)
+    p.add_argument('--local', action='store_true',
+            help='run the server in this process too')
+    return parser.parse_args(argv)
+
+
+def main(argv=None, prog=None):
+    args = parse_args(argv, prog)
+    try:
+        if args.command == 'serve':
+            asyncio.run(Server(args.max_games,
+                    args.max_client_games).run(args.host, args.port))
+        elif args.local:
+            load, server = asyncio.run(serve_and_load(args))
+            report(load, args.seconds)
+            print('server load:  {:.1f}%'.format(100 * server.busy / \
+                    args.seconds))
+        else:
+            load = Load(args.games, args.rate, random.Random(args.seed))
+            asyncio.run(load.run(args.host, args.port, args.connections,
+                    args.seconds, args.block_size))
+            report(load, args.seconds)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
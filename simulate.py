@@ -0,0 +1,365 @@
+"""
+File:           simulate.py
+Description:    Batch Monte Carlo simulation of headless games
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+Plays many games with the headless engine, spread over a pool of worker
+processes, and reports throughput and game statistics. Used to tune the
+game balance (PIECES_PER_STAGE, AVG_BLOCKS_BETWEEN_JEWELS, SPEEDS).
+
+Usage:
+    python pyjewel.py simulate [-n GAMES]
+            [--policy random|greedy|lookahead|scripted]
+
+"""
+
+import sys
+import time
+import random
+import argparse
+import multiprocessing
+from collections import Counter
+
+import ai
+from cache import LRUCache
+from engine import Engine, NOOP, LEFT, RIGHT, ROTATE, DROP
+from common import SPEEDS, PIECES_PER_STAGE, AVG_BLOCKS_BETWEEN_JEWELS
+from common import MIN_DURATION
+
+# Logic ticks never come faster than this (as in the game's Timer)
+FRAME_TIME = MIN_DURATION
+
+_cache = None       # Settle cache shared by the games of this process
+
+
+#
+# POLICIES
+#
+# A policy is called with the engine before each input, and returns one of
+# the engine's actions.
+#
+class RandomPolicy:
+    """Press random keys"""
+    def __init__(self, rng):
+        self.rng = rng
+        self.actions = (NOOP, LEFT, RIGHT, ROTATE, DROP)
+
+    def __call__(self, engine):
+        return self.rng.choice(self.actions)
+
+
+class ScriptedPolicy:
+    """Play a fixed sequence of keys, over and over
+
+    script  String of keys: l (left), r (right), u (rotate), d (drop),
+            . (nothing)
+    """
+    KEYS = {'l': LEFT, 'r': RIGHT, 'u': ROTATE, 'd': DROP, '.': NOOP}
+
+    def __init__(self, rng, script='..d'):
+        self.actions = [self.KEYS[k] for k in script]
+        self.index = 0
+
+    def __call__(self, engine):
+        action = self.actions[self.index]
+        self.index = (self.index + 1) % len(self.actions)
+        return action
+
+
+class GreedyPolicy:
+    """Steer each block to the placement that scores most right away
+
+    Every column and rotation is tried by writing the block into the
+    board where it would land and scanning through its cells; ties go to
+    the lowest landing place. Cascades are not followed.
+    """
+    def __init__(self, rng):
+        self.rng = rng
+        self.block = None
+        self.target = None
+        self.last_col = None
+
+    def landing_row(self, board, col, block_size):
+        """Row of the top jewel of a block dropped into col, or -1"""
+        r = 0
+        while r < board.nrows and board.is_empty(r, col):
+            r += 1
+        return r - block_size
+
+    def plan(self, engine):
+        board = engine.board
+        block = engine.falling_block
+        n = engine.block_size
+        best, best_value = (0, block.col), None
+
+        for col in range(engine.ncols):
+            row = self.landing_row(board, col, n)
+            if row < 0: continue
+
+            if block.iswild:
+                # Clears every jewel of the colour it lands on
+                if row + n < board.nrows:
+                    value = len(board.cells_of(board.get(row+n, col)))
+                else:
+                    value = 0
+                candidates = [(0, value)]
+            else:
+                candidates = []
+                for rotations in range(n):
+                    pieces = block.pieces[-rotations:] + \
+                            block.pieces[:-rotations] if rotations \
+                            else block.pieces
+                    cells = [(row+i, col) for i in range(n)]
+                    for (r, c), piece in zip(cells, pieces):
+                        board.set(r, c, piece)
+                    _, value = board.scan_cells(cells, engine.min_run)
+                    for r, c in cells:
+                        board.set(r, c, 0)
+                    candidates.append((rotations, value))
+
+            for rotations, value in candidates:
+                key = (value, row, -abs(col - block.col))
+                if best_value is None or key > best_value:
+                    best, best_value = (rotations, col), key
+
+        return list(best)
+
+    def __call__(self, engine):
+        block = engine.falling_block
+        if not block.ismoving:
+            return NOOP
+        if block is not self.block:
+            # New block: work out where it should go
+            self.block = block
+            self.target = self.plan(engine)
+            self.last_col = None
+
+        rotations, col = self.target
+        if rotations:
+            self.target[0] -= 1
+            return ROTATE
+        if col != block.col and block.col != self.last_col:
+            self.last_col = block.col
+            return LEFT if col < block.col else RIGHT
+        # There, or blocked on the way
+        return DROP
+
+
+class LookaheadPolicy(GreedyPolicy):
+    """Steer each block to the placement ai.Search rates best
+
+    Unlike GreedyPolicy, cascades are followed to the end, and with depth
+    2 the preview block is placed after each placement of the falling one.
+    """
+    def __init__(self, rng, weights=None, depth=2):
+        super().__init__(rng)
+        self.weights = weights
+        self.depth = depth
+        self.search = None
+
+    def plan(self, engine):
+        if self.search is None:
+            self.search = ai.Search(engine.ncols, engine.nrows,
+                    engine.block_size, engine.min_run, self.weights,
+                    self.depth)
+        block, preview = engine.falling_block, engine.preview_block
+        best = self.search.best(ai.from_board(engine.board), block.pieces,
+                block.iswild, (preview.pieces, preview.iswild), block.col,
+                block.row)
+        if best is None:
+            return [0, block.col]
+        rotations, col, value = best
+        return [rotations, col]
+
+
+POLICIES = {
+    'random': RandomPolicy,
+    'greedy': GreedyPolicy,
+    'lookahead': LookaheadPolicy,
+    'scripted': ScriptedPolicy,
+}
+
+
+def make_policy(name, rng, script=None, weights=None, depth=2):
+    if name == 'scripted' and script:
+        return ScriptedPolicy(rng, script)
+    if name == 'lookahead':
+        return LookaheadPolicy(rng, weights, depth)
+    return POLICIES[name](rng)
+
+
+#
+# GAMES
+#
+def settle_cache(size):
+    """The settle cache of this process, of size entries"""
+    global _cache
+    if _cache is None or _cache.maxsize != size:
+        _cache = LRUCache(size)
+    return _cache
+
+
+def play_game(seed, policy='random', script=None, weights=None, depth=2,
+        rate=10.0, max_ticks=None, cache_size=0, **engine_args):
+    """Play one game to the end
+
+    seed        Seed for the game (the policy's seed is derived from it)
+    weights     Evaluation weights of the lookahead policy, and depth its
+                depth (see ai.Search)
+    rate        Inputs per second of game time that the player manages.
+                At each tick the policy gets speed*rate inputs (at least 1).
+    max_ticks   Stop the game after this many ticks
+    cache_size  Entries in the settle cache (see Engine.settle()) that the
+                process's games share; 0 for none
+    engine_args Passed on to Engine(): board geometry and game balance
+
+    Returns a dict of the game's statistics.
+    """
+    cache = settle_cache(cache_size) if cache_size else None
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    engine = Engine(seed=seed, cache=cache, **engine_args)
+    player = make_policy(policy, random.Random(~seed), script, weights,
+            depth)
+    depths = Counter()
+
+    while not engine.game_over:
+        if max_ticks is not None and engine.ticks >= max_ticks:
+            break
+        blocks = engine.blocks
+        inputs = max(1, int(max(engine.speed, FRAME_TIME) * rate))
+        for i in range(inputs):
+            engine.apply(player(engine))
+        engine.tick()
+        if engine.blocks != blocks:
+            depths[engine.depth] += 1
+
+    return {
+        'score': engine.score,
+        'stage': engine.stage,
+        'ticks': engine.ticks,
+        'blocks': engine.blocks,
+        'depths': depths,
+        'cache_hits': cache.hits - hits if cache else 0,
+        'cache_misses': cache.misses - misses if cache else 0,
+    }
+
+
+def play_game_args(args):
+    # Pool.imap wants a single argument
+    seed, kwargs = args
+    return play_game(seed, **kwargs)
+
+
+def simulate(games, seed=0, procs=None, chunksize=None, **kwargs):
+    """Play a number of games across a pool of processes
+
+    Yields the statistics of each game as it finishes (in any order).
+    kwargs are passed on to play_game().
+    """
+    jobs = [(seed + i, kwargs) for i in range(games)]
+    if procs == 1:
+        for job in jobs:
+            yield play_game_args(job)
+        return
+
+    procs = procs or multiprocessing.cpu_count()
+    if chunksize is None:
+        # Big enough to keep the IPC cheap, small enough to share evenly
+        chunksize = max(1, games // (procs * 16))
+    with multiprocessing.Pool(procs) as pool:
+        yield from pool.imap_unordered(play_game_args, jobs, chunksize)
+
+
+def report(results, elapsed, procs):
+    n = len(results)
+    scores = [r['score'] for r in results]
+    stages = Counter(r['stage'] for r in results)
+    depths = Counter()
+    for r in results:
+        depths.update(r['depths'])
+    ticks = sum(r['ticks'] for r in results)
+
+    print('games:        {}'.format(n))
+    print('processes:    {}'.format(procs))
+    print('time:         {:.2f} s'.format(elapsed))
+    print('games/sec:    {:.1f}'.format(n / elapsed))
+    print('ticks/sec:    {:.0f}'.format(ticks / elapsed))
+    print('score:        avg {:.1f}, min {}, max {}'.format(
+            sum(scores) / n, min(scores), max(scores)))
+    print('stage reached:')
+    for stage in sorted(stages):
+        print('  {:>3}: {:>7} ({:5.1f}%)'.format(stage, stages[stage],
+                100*stages[stage]/n))
+    print('cascade depth (per landed block):')
+    blocks = sum(depths.values())
+    for depth in sorted(depths):
+        print('  {:>3}: {:>9} ({:5.1f}%)'.format(depth, depths[depth],
+                100*depths[depth]/blocks))
+
+    hits = sum(r['cache_hits'] for r in results)
+    lookups = hits + sum(r['cache_misses'] for r in results)
+    if lookups:
+        print('settle cache: {} hits of {} ({:.1f}%)'.format(hits, lookups,
+                100*hits/lookups))
+
+
+def parse_args(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog,
+            description='Play games headlessly and report statistics')
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('--policy', choices=sorted(POLICIES),
+            default='random')
+    parser.add_argument('--script', default=None,
+            help='keys for the scripted policy (l, r, u, d, .)')
+    parser.add_argument('--weights', default=None, metavar='FILE',
+            help='evaluation weights for the lookahead policy (JSON, or a '
+            'training checkpoint)')
+    parser.add_argument('--depth', type=int, default=2,
+            help='lookahead depth (1 or 2)')
+    parser.add_argument('--procs', type=int, default=None,
+            help='worker processes (default: one per core)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rate', type=float, default=10.0,
+            help='player inputs per second')
+    parser.add_argument('--max-ticks', type=int, default=None)
+    parser.add_argument('--cache', type=int, default=0, metavar='N',
+            help='settle cache entries per process (default: no cache)')
+    parser.add_argument('--pieces-per-stage', type=int,
+            default=PIECES_PER_STAGE)
+    parser.add_argument('--avg-blocks-between-jewels', type=int,
+            default=AVG_BLOCKS_BETWEEN_JEWELS)
+    parser.add_argument('--speeds', default=None,
+            help='comma-separated game tick (seconds) for each stage')
+    return parser.parse_args(argv)
+
+
+def main(argv=None, prog=None):
+    args = parse_args(argv, prog)
+    speeds = SPEEDS
+    if args.speeds:
+        speeds = [float(s) for s in args.speeds.split(',')]
+        speeds += [speeds[-1]] * (len(SPEEDS) - len(speeds))
+
+    procs = args.procs or multiprocessing.cpu_count()
+    start = time.perf_counter()
+    results = list(simulate(args.games, seed=args.seed, procs=procs,
+            policy=args.policy, script=args.script,
+            weights=args.weights and ai.load_weights(args.weights),
+            depth=args.depth, rate=args.rate,
+            max_ticks=args.max_ticks, cache_size=args.cache,
+            pieces_per_stage=args.pieces_per_stage,
+            avg_blocks_between_jewels=args.avg_blocks_between_jewels,
+            speeds=speeds))
+    report(results, time.perf_counter() - start, procs)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
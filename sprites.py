@@ -12,39 +12,47 @@ License:        GPL (See LICENSE file for details)
 """
 
 import arcade
-from random import randrange
+
+import assets
 
 from common import SCREEN_HEIGHT
 from common import BOARD_X, BOARD_Y
 from common import PREVIEW_X, PREVIEW_Y
-from common import NCOLS, PIECE_SIZE
-from common import BLOCK_SIZE, NUM_PIECES, WILD_PIECE
-from common import AVG_BLOCKS_BETWEEN_JEWELS
+from common import NCOLS, NROWS, PIECE_SIZE
 from common import NUM_BACKGND, NUM_FLASH
 from common import FLASH_JFRAMES, FLASH_TFRAMES
 
 class BackgroundSprite(arcade.Sprite):
-    """Sprite for a background tile with multiple textures
-    
-    base_filename   Name of a series of files containing the textures
+    """Sprite for the whole board background, with multiple textures
+
+    Each texture is one tile image repeated ncols x nrows times, so the
+    background is drawn as a single sprite, and moving to the next texture
+    is a single set_texture().
+
+    base_filename   Name of a series of images containing the textures
             This is a string with a single '%d' in it. The %d is replaced
             by a series of numbers, one for each texture, from 'start' to 'end'
     start   number of the first texture file
     end     number of the last texture file
     """
-    def __init__(self, base_filename, start, end, *args, **kwargs):
-        self.bg_index = 1
+    def __init__(self, base_filename, start, end, ncols=NCOLS, nrows=NROWS,
+            *args, **kwargs):
         super().__init__(filename=None, *args, **kwargs)
-        
+
         # Replace '%d' in filename with number
         index = base_filename.find('%d')
         filename = base_filename
+        tiles = [(c, r) for c in range(ncols) for r in range(nrows)]
 
         for n in range(start, end + 1):
             if index != -1:
                 filename = base_filename[:index] + str(n) + \
                         base_filename[index+2:]
-            self.textures.append(arcade.load_texture(filename))
+            self.textures.append(assets.tiled_texture(filename, tiles))
+        self.reset()
+
+    def reset(self):
+        self.bg_index = 1
         self.set_texture(self.bg_index)
 
     def update(self):
@@ -52,35 +60,50 @@ class BackgroundSprite(arcade.Sprite):
         self.set_texture(self.bg_index)
 
 class Jewel(arcade.Sprite):
-    """Sprite for a single jewel"""
+    """Sprite for a single jewel
+
+    The jewel itself (piece, row, col) is only a few ints on the engine's
+    board; a Jewel exists only to draw one. The frame table and the texture
+    list are shared by all the jewels, and the sprites themselves are
+    recycled by a JewelPool.
+    """
+    # Flash Animation Frames:
+    #   0: jewel
+    #   1..NUM_FLASH: flash1,2,3,4,
+    #   NUM_FLASH+1: transparent
+    AFRAMES = (0,)*FLASH_JFRAMES + \
+            tuple(range(1, NUM_FLASH+1)) + \
+            (NUM_FLASH+1,)*FLASH_TFRAMES
+    ALEN = len(AFRAMES)
+
+    # Texture list of each (jewel texture, flash textures)
+    texture_lists = {}
+
     def __init__(self, jtexture, ftextures, piece, row, col, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.reset(jtexture, ftextures, piece, row, col)
+
+    def reset(self, jtexture, ftextures, piece, row, col):
+        """Make this a new jewel, as it would be if just created"""
         self.piece = piece
         self.row, self.col = row, col
 
-        # Jewel texture
-        self.textures.append(jtexture)
-        # Textures for flash animation
-        for ftexture in ftextures:
-            self.textures.append(ftexture)
-        self.set_texture(0)
-        self.aindex = 0
-        self.animation = 'flash'
+        # Jewel texture, then textures for flash animation
+        key = (jtexture, tuple(ftextures))
+        textures = self.texture_lists.get(key)
+        if textures is None:
+            textures = self.texture_lists[key] = [jtexture] + list(ftextures)
+        self.textures = textures
 
-        # Flash Animation Frames:
-        #   0: jewel
-        #   1..NUM_FLASH: flash1,2,3,4,
-        #   NUM_FLASH+1: transparent
-        self.aframes = [0]*FLASH_JFRAMES                # jewel image
-        self.aframes += list(range(1, NUM_FLASH+1))     # flash images
-        self.aframes += [NUM_FLASH+1]*FLASH_TFRAMES     # transparent image
-        self.alen = len(self.aframes)
-
-        # Shrink animation params
+        # Shrink animation params (scale first: the texture sets the size)
         self.angle = 0.0
         self.scale = 1.0
         self.alpha = 255
 
+        self.set_texture(0)
+        self.aindex = 0
+        self.animation = 'flash'
+
         # Coords
         if col == NCOLS:
             self.left = PREVIEW_X + PIECE_SIZE
@@ -93,41 +116,96 @@ class Jewel(arcade.Sprite):
         """Animate"""
         if self.animation == 'flash':
             # 'Flash' Animation - cycle through animation frames
-            self.aindex = (self.aindex + 1) % self.alen
-            self.set_texture(self.aframes[self.aindex])
+            self.aindex = (self.aindex + 1) % self.ALEN
+            self.set_texture(self.AFRAMES[self.aindex])
         elif self.animation == 'shrink':
             # Shrink Animation
             self.angle += 2.0
             self.scale *= 0.95
             self.alpha *= 0.95
 
+class JewelPool:
+    """Jewel sprites, recycled
+
+    A released jewel is taken out of its sprite lists and kept, and the
+    next acquire() resets it instead of making a new sprite. Once a game has
+    had as many jewels out at once as it ever will, nothing more is made.
+    """
+    def __init__(self, jtextures, ftextures):
+        self.jtextures = jtextures
+        self.ftextures = ftextures
+        self.free = []
+        self.acquired = 0       # Jewels handed out
+        self.created = 0        # ... of which were newly made
+
+    def acquire(self, piece, row, col):
+        """Jewel of piece, at (row, col)"""
+        self.acquired += 1
+        if self.free:
+            s = self.free.pop()
+            s.reset(self.jtextures[piece], self.ftextures, piece, row, col)
+        else:
+            self.created += 1
+            s = Jewel(self.jtextures[piece], self.ftextures, piece, row, col)
+        return s
+
+    def release(self, sprite):
+        """Done with a jewel: remove it from its sprite lists, keep it"""
+        sprite.kill()
+        self.free.append(sprite)
+
+    @property
+    def hits(self):
+        return self.acquired - self.created
+
+    @property
+    def hit_rate(self):
+        """Fraction of the jewels handed out that were recycled"""
+        return self.hits / self.acquired if self.acquired else 0.0
+
 class JewelBlock(arcade.SpriteList):
-    """SpriteList for a jewel block"""
-    def __init__(self, jtextures=None, ftextures=None, *args, **kwargs):
+    """SpriteList for a jewel block
+
+    The same JewelBlock is used for one block after another: set_block()
+    shows the next one.
+
+    block   engine.Block whose jewels this shows. The engine owns the
+            block's position; the methods here only move the sprites.
+    pool    JewelPool the jewels come from
+    """
+    def __init__(self, pool, block=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.pool = pool
+        self.block = None
+        if block is not None:
+            self.set_block(block)
 
-        # Create a random set of jewels for this block
-        if not randrange(AVG_BLOCKS_BETWEEN_JEWELS):
-            self.iswild = True
-            self.pieces = [WILD_PIECE] * BLOCK_SIZE
-        else:
-            self.iswild = False
-            self.pieces = [randrange(NUM_PIECES)+1 for i in range(BLOCK_SIZE)]
-        
-        # Starting board coords of piece (of top jewel, specifically)
-        self.row, self.col = 0, NCOLS // 2
-        self.ismoving = False
+    def set_block(self, block):
+        """Show block, in the preview
+
+        The jewels of the last block are only taken out of this list; by
+        now they're on the board, or released.
+        """
+        for s in self.sprite_list[:]:
+            self.remove(s)
+        self.block = block
+        for i, j in enumerate(block.pieces):
+            self.append(self.pool.acquire(j, i, NCOLS))
 
-        for i, j in enumerate(self.pieces):
-            self.append(Jewel(jtextures[j], ftextures, j, i, NCOLS))
+    @property
+    def iswild(self):
+        return self.block.iswild
+
+    @property
+    def ismoving(self):
+        return self.block.ismoving
 
     def move_to_board(self):
         """Move block from preview to playing board"""
         for s in self.sprite_list:
-            s.col = NCOLS // 2
-        self.move(BOARD_X-PREVIEW_X + self.col*PIECE_SIZE,
+            s.col = self.block.col
+        self.move(BOARD_X-PREVIEW_X + self.block.col*PIECE_SIZE,
                 PREVIEW_Y-BOARD_Y + PIECE_SIZE)
-        self.ismoving = True
 
     def rotate(self):
         """Rotate down the jewels in the block"""
@@ -143,31 +221,61 @@ class JewelBlock(arcade.SpriteList):
         # Reorder sprites in the list
         self.insert(0, self.pop())
 
-        # Reorder data
-        self.pieces.insert(0, self.pieces.pop())
-
     def move_left(self):
         """Move block left one unit"""
         self.move(-PIECE_SIZE, 0)
-        self.col -= 1
         for s in self.sprite_list:
             s.col -= 1
 
     def move_right(self):
         """Move block right one unit"""
         self.move(PIECE_SIZE, 0)
-        self.col += 1
         for s in self.sprite_list:
             s.col += 1
 
-    def move_down(self):
-        """Move block down one unit"""
-        self.move(0, -PIECE_SIZE)
-        self.row += 1
+    def move_down(self, rows=1):
+        """Move block down 'rows' units"""
+        self.move(0, -PIECE_SIZE*rows)
         for s in self.sprite_list:
-            s.row += 1
+            s.row += rows
 
 class JewelList(arcade.SpriteList):
+    """SpriteList of jewels, indexed by their (row, col) on the board"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = {}
+
+    def append(self, sprite):
+        super().append(sprite)
+        self.index[(sprite.row, sprite.col)] = sprite
+
+    def remove(self, sprite):
+        # Also called by Sprite.kill() and SpriteList.pop()
+        super().remove(sprite)
+        self.unindex(sprite)
+
+    def unindex(self, sprite):
+        key = (sprite.row, sprite.col)
+        if self.index.get(key) is sprite:
+            del self.index[key]
+
+    def move_jewel(self, sprite, row, col):
+        """Move a jewel to another cell
+
+        Updates the index of every JewelList the jewel is in.
+        """
+        jewel_lists = [sl for sl in sprite.sprite_lists \
+                if isinstance(sl, JewelList)]
+        for sl in jewel_lists:
+            sl.unindex(sprite)
+
+        sprite.center_x += PIECE_SIZE*(col - sprite.col)
+        sprite.center_y -= PIECE_SIZE*(row - sprite.row)
+        sprite.row, sprite.col = row, col
+
+        for sl in jewel_lists:
+            sl.index[(row, col)] = sprite
+
     def print(self):
         print('JewelList.print:', end=' ')
         for s in self.sprite_list:
@@ -175,12 +283,8 @@ class JewelList(arcade.SpriteList):
         print('')
 
     def find(self, row, col):
-        for s in self.sprite_list:
-            if s.row == row and s.col == col:
-                return s
-        print ('ERROR: Couldn\'t find ({},{})'.format(row,col))
-        self.print()
-        return None
+        """Jewel at (row, col), or None"""
+        return self.index.get((row, col))
 
 
 # vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -0,0 +1,62 @@
+"""
+File:           test_engine.py
+Description:    Tests of the headless game engine
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+Run with: python -m pytest -q
+
+"""
+
+import pytest
+
+from engine import Engine, LEFT, RIGHT, ROTATE, DROP, EXIT
+
+
+def falling_engine(seed=1):
+    """An engine with a block falling, a few rows down"""
+    engine = Engine(seed=seed)
+    while not engine.falling_block.ismoving:
+        engine.tick()
+    for i in range(3):
+        engine.tick()
+    return engine
+
+
+def state(engine):
+    fb = engine.falling_block
+    return (engine.board.tolist(), engine.board.hash, engine.score,
+            engine.stage, engine.lives, engine.ticks,
+            tuple(fb.pieces), fb.row, fb.col)
+
+
+@pytest.mark.parametrize('action', [LEFT, RIGHT, ROTATE, DROP])
+def test_nothing_moves_after_exit(action):
+    engine = falling_engine()
+    engine.apply(EXIT)
+    assert engine.game_over
+    assert not engine.falling_block.ismoving
+    before = state(engine)
+
+    engine.apply(action)
+    engine.tick()
+    assert state(engine) == before
+
+
+def test_nothing_scores_after_exit():
+    engine = falling_engine()
+    engine.apply(EXIT)
+    score = engine.score
+    assert engine.drop() is None
+    assert not engine.rotate()
+    assert not engine.move_left()
+    assert not engine.move_right()
+    assert engine.step(DROP) == 0
+    assert engine.score == score
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -0,0 +1,102 @@
+"""
+File:           text.py
+Description:    Text drawn from pre-built labels
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+arcade.draw_text() lays out and draws its text on every call. A TextLayer
+instead holds a set of labels that are laid out when they are made, and
+again only when their text changes, and draws all of them with a single
+pyglet batch.
+
+"""
+
+import arcade
+import pyglet
+
+from common import VERSION_STR, VERSION_X, VERSION_Y
+
+DEFAULT_FONT = ('calibri', 'arial')     # As arcade.draw_text()
+
+
+class Label:
+    """A label of a TextLayer
+
+    Setting text (any value, shown as a string) or hiding the label lays it
+    out again only when what's shown actually changes.
+    """
+    __slots__ = ('label', '_text', '_visible')
+
+    def __init__(self, batch, text, x, y, color, font_size, font_name,
+            bold, italic, anchor_x, anchor_y):
+        self._text = str(text)
+        self._visible = True
+        if len(color) == 3:
+            color = tuple(color) + (255,)
+        self.label = pyglet.text.Label(self._text, x=x, y=y,
+                font_name=font_name or DEFAULT_FONT, font_size=font_size,
+                bold=bold, italic=italic, color=color,
+                anchor_x=anchor_x, anchor_y=anchor_y, batch=batch)
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        value = str(value)
+        if value != self._text:
+            self._text = value
+            if self._visible:
+                self.label.text = value
+
+    @property
+    def visible(self):
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible):
+        if visible != self._visible:
+            self._visible = visible
+            self.label.text = self._text if visible else ''
+
+    @property
+    def y(self):
+        return self.label.y
+
+    @y.setter
+    def y(self, y):
+        if y != self.label.y:
+            self.label.y = y
+
+
+class TextLayer:
+    """Labels drawn together"""
+
+    def __init__(self):
+        self.batch = pyglet.graphics.Batch()
+
+    def add(self, text, x, y, color=arcade.color.WHITE, font_size=12,
+            font_name=None, bold=False, italic=False, anchor_x='left',
+            anchor_y='baseline'):
+        """New label, with the same arguments as arcade.draw_text()"""
+        return Label(self.batch, text, x, y, color, font_size, font_name,
+                bold, italic, anchor_x, anchor_y)
+
+    def add_version(self):
+        """The version string, as shown at the bottom of most views"""
+        return self.add(VERSION_STR, VERSION_X, VERSION_Y,
+                font_size=16, font_name='calibri', bold=True, italic=True,
+                anchor_x='left', anchor_y='top')
+
+    def draw(self):
+        # pyglet needs its own projection set up within arcade
+        with arcade.get_window().ctx.pyglet_rendering():
+            self.batch.draw()
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
@@ -0,0 +1,261 @@
+"""
+File:           train.py
+Description:    Tune the bot's evaluation weights by self-play
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+An evolution strategy over the weights of ai.Search. Each generation
+samples a population of weights around the current mean, plays every one
+of them through the same seeded games with simulate's lookahead policy,
+and moves the mean towards the best half. A candidate's fitness is its
+average game score, as the engine scores it: 300 + (n-3)*150 points a run,
+doubled at each step of a cascade.
+
+The games of a generation are spread over a pool of worker processes, as
+in simulate.py, and their results are taken as they finish. After every
+generation the state of the run is saved to a JSON checkpoint, which
+--resume carries on from, and which simulate --weights can play.
+
+Usage:
+    python pyjewel.py train [-g GENERATIONS] [--population N] [--games N]
+            [--checkpoint FILE] [--resume]
+
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import multiprocessing
+
+import ai
+from simulate import play_game
+
+CHECKPOINT_FILE = 'pyjewel-train.json'
+VERSION = 1
+
+# Weights left as they are: points sets the scale of the others, and
+# topout only has to outweigh everything else
+FIXED = ('points', 'topout')
+
+
+def tuned(weights):
+    """Names of the weights the search moves"""
+    return [name for name in sorted(weights) if name not in FIXED]
+
+
+class Trainer:
+    """State of a training run, as saved in its checkpoint
+
+    population  Candidates per generation
+    games       Games played by each candidate (the same seeds for all the
+                candidates of a generation)
+    sigma       Size of the steps, relative to each weight's scale
+    decay       sigma is multiplied by this after every generation
+    The other settings are passed on to simulate.play_game().
+    """
+
+    def __init__(self, seed=0, population=16, games=8, sigma=0.3,
+            decay=0.95, depth=1, rate=10.0, max_ticks=2000, weights=None):
+        self.seed = seed
+        self.population = population
+        self.games = games
+        self.sigma = sigma
+        self.decay = decay
+        self.depth = depth
+        self.rate = rate
+        self.max_ticks = max_ticks
+        self.mean = dict(ai.WEIGHTS if weights is None else weights)
+        # Scale of each weight: steps are relative to where it started
+        self.scale = {name: max(abs(w), 1.0) \
+                for name, w in self.mean.items()}
+        self.generation = 0
+        self.best = None        # {'weights', 'fitness', 'generation'}
+        self.history = []
+
+    SETTINGS = ('seed', 'population', 'games', 'sigma', 'decay', 'depth',
+            'rate', 'max_ticks', 'mean', 'scale', 'generation', 'best',
+            'history')
+
+    #
+    # CHECKPOINTS
+    #
+    def save(self, path):
+        """Save the run, replacing path only once it's all written"""
+        state = {name: getattr(self, name) for name in self.SETTINGS}
+        state['version'] = VERSION
+        with open(path + '.tmp', 'w') as f:
+            json.dump(state, f, indent=1)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('version') != VERSION:
+            raise ValueError('{}: not a training checkpoint'.format(path))
+        trainer = cls()
+        for name in cls.SETTINGS:
+            setattr(trainer, name, state[name])
+        return trainer
+
+    #
+    # SEARCH
+    #
+    def candidates(self):
+        """Weights to try this generation, and the seeds of its games
+
+        Both come from the run's seed and the generation number, so a
+        resumed run plays the generation it stopped in all over again.
+        """
+        rng = random.Random('{}:{}'.format(self.seed, self.generation))
+        names = tuned(self.mean)
+        population = []
+        for i in range(self.population):
+            weights = dict(self.mean)
+            for name in names:
+                weights[name] += self.sigma * self.scale[name] * \
+                        rng.gauss(0.0, 1.0)
+            population.append(weights)
+        seeds = [rng.getrandbits(32) for i in range(self.games)]
+        return population, seeds
+
+    def jobs(self, population, seeds):
+        for index, weights in enumerate(population):
+            for seed in seeds:
+                yield (index, seed, dict(policy='lookahead', weights=weights,
+                        depth=self.depth, rate=self.rate,
+                        max_ticks=self.max_ticks))
+
+    def update(self, population, fitness):
+        """Move the mean to a weighted average of the best half"""
+        mu = max(1, len(population) // 2)
+        ranked = sorted(range(len(population)), key=lambda i: fitness[i],
+                reverse=True)[:mu]
+        # Log-rank weights, as in CMA-ES
+        w = [math.log(mu + 0.5) - math.log(k + 1) for k in range(mu)]
+        total = sum(w)
+        self.mean = {name: sum(wk * population[i][name] \
+                for wk, i in zip(w, ranked)) / total \
+                for name in self.mean}
+        self.sigma *= self.decay
+
+        top = ranked[0]
+        if self.best is None or fitness[top] > self.best['fitness']:
+            self.best = {'weights': population[top],
+                    'fitness': fitness[top], 'generation': self.generation}
+        self.generation += 1
+
+
+def play_job(args):
+    # Pool.imap wants a single argument
+    index, seed, kwargs = args
+    return index, play_game(seed, **kwargs)
+
+
+def run_generation(trainer, pool, chunksize=1):
+    """Play a generation's games and update the trainer
+
+    Returns the fitness of each candidate, and the games played.
+    """
+    population, seeds = trainer.candidates()
+    jobs = list(trainer.jobs(population, seeds))
+    scores = [[] for i in population]
+    if pool is None:
+        results = map(play_job, jobs)
+    else:
+        results = pool.imap_unordered(play_job, jobs, chunksize)
+    for index, result in results:
+        scores[index].append(result['score'])
+
+    fitness = [sum(s) / len(s) for s in scores]
+    trainer.update(population, fitness)
+    return fitness, len(jobs)
+
+
+def parse_args(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog,
+            description='Tune the lookahead bot\'s weights by self-play')
+    parser.add_argument('-g', '--generations', type=int, default=20,
+            help='generations to run (more, when resuming)')
+    parser.add_argument('--population', type=int, default=16)
+    parser.add_argument('--games', type=int, default=8,
+            help='games per candidate')
+    parser.add_argument('--sigma', type=float, default=0.3,
+            help='step size, relative to each weight')
+    parser.add_argument('--decay', type=float, default=0.95,
+            help='sigma is multiplied by this every generation')
+    parser.add_argument('--depth', type=int, default=1,
+            help='lookahead depth of the games (1 or 2)')
+    parser.add_argument('--rate', type=float, default=10.0,
+            help='player inputs per second')
+    parser.add_argument('--max-ticks', type=int, default=2000,
+            help='game length limit')
+    parser.add_argument('--weights', default=None, metavar='FILE',
+            help='weights to start from (default: ai.WEIGHTS)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--procs', type=int, default=None,
+            help='worker processes (default: one per core)')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE,
+            help='file the run is saved to after each generation')
+    parser.add_argument('--resume', action='store_true',
+            help='carry on from the checkpoint, with its settings')
+    return parser.parse_args(argv)
+
+
+def main(argv=None, prog=None):
+    args = parse_args(argv, prog)
+    if args.resume:
+        trainer = Trainer.load(args.checkpoint)
+        print('Resuming {} at generation {}'.format(args.checkpoint,
+                trainer.generation))
+    else:
+        trainer = Trainer(args.seed, args.population, args.games,
+                args.sigma, args.decay, args.depth, args.rate,
+                args.max_ticks,
+                args.weights and ai.load_weights(args.weights))
+
+    procs = args.procs or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(procs) if procs > 1 else None
+    print('{:>4} {:>12} {:>12} {:>12} {:>10} {:>12}'.format('gen', 'best',
+            'average', 'best ever', 'games/s', 'games/s/core'))
+    try:
+        for i in range(args.generations):
+            generation = trainer.generation
+            start = time.perf_counter()
+            fitness, games = run_generation(trainer, pool)
+            elapsed = time.perf_counter() - start
+
+            trainer.history.append({'generation': generation,
+                    'best': max(fitness),
+                    'average': sum(fitness) / len(fitness),
+                    'games': games, 'seconds': elapsed})
+            trainer.save(args.checkpoint)
+            print('{:>4} {:>12.0f} {:>12.0f} {:>12.0f} {:>10.2f} '
+                    '{:>12.2f}'.format(generation, max(fitness),
+                    sum(fitness) / len(fitness), trainer.best['fitness'],
+                    games / elapsed, games / elapsed / procs))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if trainer.best is not None:
+        print('Best weights (generation {}):'.format(
+                trainer.best['generation']))
+        for name, w in sorted(trainer.best['weights'].items()):
+            print('  {:<12} {:12.3f}'.format(name, w))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent:
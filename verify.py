@@ -0,0 +1,124 @@
+"""
+File:           verify.py
+Description:    Verify the final score and stage of recorded games
+
+Author:         Prabhanjan M. <prabhanjan@gmail.com>
+Created:        18 Oct, 2026
+Last Modified:
+
+Copyright:      (C) 2024, Prabhanjan M.
+License:        GPL (See LICENSE file for details)
+
+Reruns replays through the headless engine, which resolves every cascade
+at once, with none of the flash and fill delays of the game view, and
+checks that they end on the stage and score they claim. Directories of
+replays are verified over a pool of worker processes.
+
+Usage:
+    python pyjewel.py verify [--procs N] FILE|DIR...
+
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from collections import namedtuple
+
+from replay import Replay, ReplayError
+
+REPLAY_EXT = '.replay'
+
+# ok is False if the replay didn't match its claim, or couldn't be read
+# (then error says why, and stage and score are None)
+Result = namedtuple('Result', 'path ok stage score claimed_stage '
+        'claimed_score ticks error')
+
+
+def verify(replay, path=None):
+    """Rerun replay; returns a Result"""
+    engine = replay.run()
+    ok = (engine.stage, engine.score) == (replay.stage, replay.score)
+    return Result(path, ok, engine.stage, engine.score, replay.stage,
+            replay.score, engine.ticks, None)
+
+
+def verify_file(path):
+    try:
+        replay = Replay.load(path)
+    except (OSError, ReplayError) as e:
+        return Result(path, False, None, None, None, None, None, str(e))
+    return verify(replay, path)
+
+
+def replay_files(paths):
+    """The given files, and the replays in the given directories"""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(REPLAY_EXT):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def verify_files(paths, procs=None, chunksize=None):
+    """Verify a number of replay files across a pool of processes
+
+    Yields a Result for each file as it's done (in any order).
+    """
+    paths = list(paths)
+    if procs == 1 or len(paths) < 2:
+        yield from map(verify_file, paths)
+        return
+
+    procs = procs or multiprocessing.cpu_count()
+    if chunksize is None:
+        # Big enough to keep the IPC cheap, small enough to share evenly
+        chunksize = max(1, len(paths) // (procs * 16))
+    with multiprocessing.Pool(procs) as pool:
+        yield from pool.imap_unordered(verify_file, paths, chunksize)
+
+
+def parse_args(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog,
+            description='Verify the score and stage of recorded games')
+    parser.add_argument('paths', nargs='+', metavar='FILE|DIR',
+            help='replay files, or directories of *{} files'.format(
+            REPLAY_EXT))
+    parser.add_argument('--procs', type=int, default=None,
+            help='worker processes (default: one per core)')
+    parser.add_argument('-v', '--verbose', action='store_true',
+            help='list every replay, not just the failures')
+    return parser.parse_args(argv)
+
+
+def main(argv=None, prog=None):
+    args = parse_args(argv, prog)
+
+    start = time.perf_counter()
+    n = failed = 0
+    for result in verify_files(replay_files(args.paths), args.procs):
+        n += 1
+        if result.error:
+            print('{}: ERROR {}'.format(result.path, result.error))
+        elif not result.ok:
+            print('{}: FAIL claims stage {}, score {}; replays to stage {}, '
+                    'score {}'.format(result.path, result.claimed_stage,
+                    result.claimed_score, result.stage, result.score))
+        elif args.verbose:
+            print('{}: ok stage {}, score {}'.format(result.path,
+                    result.stage, result.score))
+        failed += not result.ok
+    elapsed = time.perf_counter() - start
+
+    print('{} replays, {} failed, in {:.2f} s ({:.1f} ms each)'.format(n,
+            failed, elapsed, 1000*elapsed/max(n, 1)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:ft=python tabstop=4 expandtab autoindent foldmethod=indent: